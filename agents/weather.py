@@ -1,13 +1,26 @@
 from abc import ABC, abstractmethod
 from autogen import Agent
 from datetime import datetime
-from typing import Annotated, Callable, Dict, List, Literal, Optional, Tuple, Union
+from typing import Annotated, Callable, Dict, List, Literal, Optional, Union
 
 from .api import ApiAgent
+from api.cache import ResponseCache
+from api.forecast_columns import ForecastColumns
+from api.geocode_store import GeocodeStore, normalize as normalize_location
 from api.openweathermap import ExcludeInfo, OneCallResponse, OpenWeatherMapApi, Units
+from api.tool_cache import memoize
+
+
+def _location_arguments(arguments: Dict):
+    return {"location": normalize_location(arguments["location"])}
 
 
 class WeatherProvider(ABC):
+    @property
+    def cache_scope(self) -> str:
+        """Same for providers that return the same results, memoized tools are shared within it."""
+        return type(self).__name__
+
     @abstractmethod
     def current(self, location: str) -> dict:
         ...
@@ -22,25 +35,50 @@ class WeatherProvider(ABC):
 
 
 class OpenWeatherMapProvider(WeatherProvider):
+    # How long (in seconds) a fetched OneCall payload may serve each view
+    CURRENT_MAX_AGE = 10 * 60
+    HOURLY_MAX_AGE = 60 * 60
+    DAILY_MAX_AGE = 3 * 60 * 60
+    # Decimal places kept when keying the cache (~1km)
+    CACHE_PRECISION = 2
+
     api: OpenWeatherMapApi
-    _latlon_cache: Dict[str, Tuple[float, float]]
+    one_call_cache: ResponseCache
+    geocode_store: GeocodeStore
     _alerts: bool
+    _summarize: bool
 
-    def __init__(self, api_key: str, alerts: bool = False):
+    def __init__(
+        self,
+        api_key: str,
+        alerts: bool = False,
+        cache_size: int = 128,
+        summarize: bool = False,
+        geocode_store: GeocodeStore|None = None,
+    ):
         self.api = OpenWeatherMapApi(api_key, units=Units.METRIC)
+        self.one_call_cache = ResponseCache(cache_size)
+        self.geocode_store = geocode_store or GeocodeStore.default()
         self._alerts = alerts
-        self._latlon_cache = {}
+        # Report forecasts as one summary of the whole horizon instead of entry by entry
+        self._summarize = summarize
+
+    @property
+    def cache_scope(self):
+        return f"openweathermap:alerts={int(self._alerts)}:summarize={int(self._summarize)}"
 
     def _latlon(self, location: str):
-        lower = location.lower()
-        result = self._latlon_cache.get(lower)
-        if result is None:
-            response = self.api.geocode(location)
-            if not response:
-                raise ValueError(f"Could not find location: {location}")
-            result = response[0].lat, response[0].lon
-            self._latlon_cache[lower] = result
-        return result
+        return self.geocode_store.resolve(location, self.api.geocode)
+
+    def _one_call(self, location: str, max_age: float) -> OneCallResponse:
+        lat, lon = self._latlon(location)
+        key = (round(lat, self.CACHE_PRECISION), round(lon, self.CACHE_PRECISION))
+        response = self.one_call_cache.get(key, max_age)
+        if response is None:
+            # Fetch everything the views need at once, so they can share the payload
+            response = self.api.one_call(lat=lat, lon=lon, exclude=[ExcludeInfo.MINUTELY])
+            self.one_call_cache.put(key, response)
+        return response
 
     def _process_alerts(self, alerts: List[OneCallResponse.Alert]|None):
         if not alerts:
@@ -71,23 +109,45 @@ class OpenWeatherMapProvider(WeatherProvider):
             result["alerts"] = self._process_alerts(alerts)
         return result
 
+    def _format_summary(self, columns: ForecastColumns):
+        if not len(columns):
+            return {}
+        result = {
+            "from": datetime.fromtimestamp(columns.dt[0]).isoformat(),
+            "to": datetime.fromtimestamp(columns.dt[-1]).isoformat(),
+            "temp_c_min": float(columns.temp_min.min()),
+            "temp_c_max": float(columns.temp_max.max()),
+            "wind_max_meter_per_sec": columns.max_wind(),
+            "weather": columns.group_counts(),
+            "precipitation_chance_max": float(columns.pop.max()),
+            "entries_likely_precipitation": columns.count_pop_above(0.5),
+        }
+        if (rain := columns.rain_total()) > 0:
+            result["rain_mm_total"] = rain
+        if (snow := columns.snow_total()) > 0:
+            result["snow_mm_total"] = snow
+        return result
+
     def current(self, location: str):
-        lat, lon = self._latlon(location)
-        response = self.api.one_call(lat, lon, exclude=[ExcludeInfo.MINUTELY, ExcludeInfo.HOURLY, ExcludeInfo.DAILY])
+        response = self._one_call(location, self.CURRENT_MAX_AGE)
         return self._format_response(response.current, response.alerts)
 
     def forecast_hourly(self, location: str):
-        lat, lon = self._latlon(location)
-        response = self.api.one_call(lat, lon, exclude=[ExcludeInfo.CURRENT, ExcludeInfo.MINUTELY, ExcludeInfo.DAILY])
-        result = {"hourly": [self._format_response(hour, None) for hour in response.hourly]}
+        response = self._one_call(location, self.HOURLY_MAX_AGE)
+        if self._summarize:
+            result = {"hourly_summary": self._format_summary(response.hourly_columns)}
+        else:
+            result = {"hourly": [self._format_response(hour, None) for hour in response.hourly]}
         if self._alerts and response.alerts:
             result["alerts"] = self._process_alerts(response.alerts)
         return result
 
     def forecast_daily(self, location: str):
-        lat, lon = self._latlon(location)
-        response = self.api.one_call(lat, lon, exclude=[ExcludeInfo.CURRENT, ExcludeInfo.MINUTELY, ExcludeInfo.HOURLY])
-        result = {"daily": [self._format_response(day, None) for day in response.daily]}
+        response = self._one_call(location, self.DAILY_MAX_AGE)
+        if self._summarize:
+            result = {"daily_summary": self._format_summary(response.daily_columns)}
+        else:
+            result = {"daily": [self._format_response(day, None) for day in response.daily]}
         if self._alerts and response.alerts:
             result["alerts"] = self._process_alerts(response.alerts)
         return result
@@ -105,6 +165,11 @@ class WeatherAgent(ApiAgent):
         "Ask them to tell you about the current or forecast weather."
     )
 
+    # How long (in seconds) a tool result is reused for the same location
+    CURRENT_TOOL_TTL = 5 * 60
+    HOURLY_TOOL_TTL = 30 * 60
+    DAILY_TOOL_TTL = 90 * 60
+
     def __init__(
         self,
         name: str,
@@ -120,14 +185,19 @@ class WeatherAgent(ApiAgent):
         description: Optional[str] = None,
         chat_messages: Optional[Dict[Agent, List[Dict]]] = None,
     ):
+        scope = weather_provider.cache_scope
+
+        @memoize(self.CURRENT_TOOL_TTL, scope, _location_arguments)
         def get_current_weather(location: Annotated[str, "Where to query the weather"]) -> dict:
             """Get the current weather for a location."""
             return weather_provider.current(location)
-        
+
+        @memoize(self.HOURLY_TOOL_TTL, scope, _location_arguments)
         def get_hourly_forecast(location: Annotated[str, "Where to query the weather"]) -> dict:
             """Get the hourly forecast for a location."""
             return weather_provider.forecast_hourly(location)
-        
+
+        @memoize(self.DAILY_TOOL_TTL, scope, _location_arguments)
         def get_daily_forecast(location: Annotated[str, "Where to query the weather"]) -> dict:
             """Get the daily forecast for a location."""
             return weather_provider.forecast_daily(location)
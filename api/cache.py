@@ -0,0 +1,61 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Callable, Hashable, Tuple
+
+
+class ResponseCache:
+    max_entries: int
+    hits: int
+    misses: int
+    _entries: "OrderedDict[Hashable, Tuple[float, Any]]"
+    _clock: Callable[[], float]
+    _lock: threading.Lock
+
+    def __init__(self, max_entries: int = 128, clock: Callable[[], float] = time.monotonic):
+        assert max_entries > 0, "Cache must hold at least one entry"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, max_age: float):
+        """Return the cached value if it is younger than `max_age` seconds, otherwise None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry[0] > max_age:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
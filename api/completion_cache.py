@@ -0,0 +1,155 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_PATH = os.getenv("COMPLETION_CACHE_PATH") or os.path.join(
+    os.path.expanduser("~"), ".cache", "agents", "completions.sqlite3"
+)
+
+
+class CompletionCache:
+    """Disk-backed LLM completion cache, usable wherever autogen takes a `cache`.
+
+    `OpenAIWrapper.create` keys completions by the request (model, messages, tools, temperature,
+    ...) serialized with sorted keys, which is hashed here. The least recently used entries are
+    evicted once the stored completions exceed `max_bytes`. The database is shared by processes
+    and only opened on first use.
+    """
+
+    path: str
+    max_bytes: int
+    hits: int
+    misses: int
+    evicted: int
+    _db: sqlite3.Connection|None
+    _lock: threading.Lock
+
+    _default: "CompletionCache|None" = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = 256 * 1024 * 1024):
+        assert max_bytes > 0, "Cache must be able to hold something"
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    @classmethod
+    def default(cls):
+        """Process-wide cache at DEFAULT_PATH."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold the lock
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+        return self._db
+
+    @staticmethod
+    def hash(key: str):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        digest = self.hash(key)
+        with self._lock:
+            db = self._connection()
+            row = db.execute("SELECT value FROM completions WHERE key = ?", (digest,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE completions SET accessed = ? WHERE key = ?", (time.time(), digest))
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        data = pickle.dumps(value)
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                    (self.hash(key), data, len(data), time.time()),
+                )
+                self._evict(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def _evict(self, db: sqlite3.Connection):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest first until back under the limit (the newest entry is always kept)
+        excess = total - self.max_bytes
+        for key, size in db.execute(
+            "SELECT key, size FROM completions ORDER BY accessed LIMIT (SELECT COUNT(*) - 1 FROM completions)"
+        ).fetchall():
+            if excess <= 0:
+                break
+            db.execute("DELETE FROM completions WHERE key = ?", (key,))
+            excess -= size
+            self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM completions")
+
+    def close(self) -> None:
+        # autogen closes the cache after every request, the connection stays open for the next one
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "entries": count,
+            "bytes": size,
+        }
+
+
+class CachedClient:
+    """Passes `cache` to every `create` of an OpenAIWrapper unless the call sets its own."""
+
+    client: Any
+    cache: CompletionCache
+
+    def __init__(self, client: Any, cache: CompletionCache):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+    def create(self, **config: Any):
+        config.setdefault("cache", self.cache)
+        return self.client.create(**config)
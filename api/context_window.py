@@ -0,0 +1,160 @@
+import functools
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from autogen import ConversableAgent
+import autogen.token_count_utils as token_count_utils
+import tiktoken
+
+from .cache import ResponseCache
+
+# Fixed per-message overhead of the chat format, as counted by token_count_utils for gpt-4
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+# Estimates models tiktoken does not know (e.g. mistral, llama3)
+FALLBACK_ENCODING = "cl100k_base"
+
+
+def model_from_config(llm_config: Optional[Dict]) -> Optional[str]:
+    if not llm_config:
+        return None
+    if "model" in llm_config:
+        return llm_config["model"]
+    config_list = llm_config.get("config_list") or []
+    return config_list[0].get("model") if config_list else None
+
+
+@functools.lru_cache(maxsize=None)
+def encoding_for(model: Optional[str]) -> tiktoken.Encoding:
+    """tiktoken encoding of `model` (FALLBACK_ENCODING if tiktoken does not know it), resolved once."""
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+class ContextWindow:
+    """Keeps the messages sent to an inner assistant within a token budget.
+
+    The system prompt and tool schemas are always sent. Once the budget is hit, the newest
+    messages are kept and older ones are dropped, or replaced by one summary message if a
+    summarizer is given. Token counts are cached per message.
+    """
+
+    model: Optional[str]
+    budget: int
+    summarizer: Optional[Callable[[List[Dict]], str]]
+    summary_tokens: int
+    trimmed: int
+    _agent: Optional[ConversableAgent]
+    _counts: ResponseCache
+    _pinned: Tuple[Tuple, int]|None
+    _summary: Tuple[Tuple, Dict]|None
+
+    def __init__(
+        self,
+        model: Optional[str],
+        budget: int,
+        summarizer: Optional[Callable[[List[Dict]], str]] = None,
+        summary_tokens: int = 256,
+        cache_size: int = 4096,
+    ):
+        assert budget > 0, "Context budget must be positive"
+        self.model = model
+        self.budget = budget
+        # The summarizer should stay within `summary_tokens`, that much of the budget is set aside
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens
+        self.trimmed = 0
+        self._agent = None
+        self._counts = ResponseCache(cache_size)
+        self._pinned = None
+        self._summary = None
+
+    @classmethod
+    def for_model(
+        cls,
+        model: Optional[str],
+        budget: Optional[int] = None,
+        reserve_tokens: int = 1024,
+        summarizer: Optional[Callable[[List[Dict]], str]] = None,
+    ) -> Optional["ContextWindow"]:
+        """Window sized from `max_token_limit` (minus room for the reply) unless `budget` is given."""
+        if budget is None:
+            if model is None:
+                return None
+            limit = token_count_utils.max_token_limit.get(model)
+            if limit is None:
+                return None
+            budget = limit - reserve_tokens
+        return cls(model, budget, summarizer)
+
+    def attach(self, agent: ConversableAgent):
+        self._agent = agent
+        agent.register_hook("process_all_messages_before_reply", self.trim)
+
+    def _count_text(self, text: str):
+        return len(encoding_for(self.model).encode(text, disallowed_special=()))
+
+    def count(self, message: Dict) -> int:
+        content = message.get("content")
+        tool_calls = message.get("tool_calls")
+        key = (
+            message.get("role"),
+            content if isinstance(content, str) else json.dumps(content),
+            message.get("name"),
+            message.get("tool_call_id"),
+            json.dumps(tool_calls) if tool_calls else None,
+        )
+        result = self._counts.get(key, float("inf"))
+        if result is None:
+            result = TOKENS_PER_MESSAGE + sum(self._count_text(part) for part in key if part)
+            if message.get("name"):
+                result += TOKENS_PER_NAME
+            self._counts.put(key, result)
+        return result
+
+    def pinned_tokens(self) -> int:
+        """Tokens of the system prompt and tool schemas, which are sent every time."""
+        if self._agent is None:
+            return 0
+        system_message = self._agent.system_message
+        tools = (self._agent.llm_config or {}).get("tools") or []
+        key = (system_message, len(tools))
+        if self._pinned is None or self._pinned[0] != key:
+            tokens = self.count({"role": "system", "content": system_message})
+            if tools:
+                tokens += self._count_text(json.dumps(tools))
+            self._pinned = key, tokens
+        return self._pinned[1]
+
+    def _summarize(self, dropped: List[Dict]) -> Dict:
+        # Dropped prefixes mostly repeat between turns, reuse the last summary when they do
+        key = (len(dropped), json.dumps(dropped[-1], default=str))
+        if self._summary is None or self._summary[0] != key:
+            content = "Summary of the earlier conversation: " + self.summarizer(dropped)
+            self._summary = key, {"role": "user", "content": content}
+        return self._summary[1]
+
+    def trim(self, messages: List[Dict]) -> List[Dict]:
+        budget = self.budget - self.pinned_tokens()
+        counts = [self.count(message) for message in messages]
+        if sum(counts) <= budget or len(messages) < 2:
+            return messages
+        if self.summarizer is not None:
+            budget -= self.summary_tokens
+        # Keep the newest messages that fit, the last one is always sent
+        start = len(messages) - 1
+        used = counts[start]
+        while start > 0 and used + counts[start - 1] <= budget:
+            start -= 1
+            used += counts[start]
+        # A tool response must not be sent without the call it answers
+        while start < len(messages) - 1 and messages[start].get("role") in ("tool", "function"):
+            start += 1
+        self.trimmed += start
+        if self.summarizer is not None and start > 0:
+            return [self._summarize(messages[:start])] + messages[start:]
+        return messages[start:]
@@ -0,0 +1,135 @@
+import datetime
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from .openweathermap import ALL_CONDITIONS
+
+# Condition groups ("Rain", "Clouds", ...) indexed by position, "Unknown" is always last
+CONDITION_GROUPS = tuple(sorted({cond.group for cond in ALL_CONDITIONS.values()})) + ("Unknown",)
+UNKNOWN_GROUP = len(CONDITION_GROUPS) - 1
+
+# Maps a condition code (0-999) to its index in CONDITION_GROUPS
+CONDITION_GROUP_LOOKUP = np.full(1000, UNKNOWN_GROUP, dtype=np.int8)
+for _code, _cond in ALL_CONDITIONS.items():
+    CONDITION_GROUP_LOOKUP[_code] = CONDITION_GROUPS.index(_cond.group)
+
+
+def _weather_code(item: dict):
+    weather = item.get("weather")
+    if isinstance(weather, list):
+        weather = weather[0] if weather else None
+    return weather["id"] if weather else 0
+
+
+def _precipitation(value: Any):
+    # Hourly entries report {"1h": mm}, daily entries a plain mm total
+    if isinstance(value, dict):
+        return value.get("1h", 0.0)
+    return value or 0.0
+
+
+def _temperature(key: str):
+    def getter(item: dict):
+        temp = item["temp"]
+        return temp[key] if isinstance(temp, dict) else temp
+    return getter
+
+
+def _feels_like(item: dict):
+    feels_like = item["feels_like"]
+    return feels_like["day"] if isinstance(feels_like, dict) else feels_like
+
+
+def _column(items: List[dict], getter: Callable[[dict], Any], dtype):
+    return np.fromiter((getter(item) for item in items), dtype=dtype, count=len(items))
+
+
+class ForecastColumns:
+    """Hourly or daily OneCall entries as NumPy columns, one array per field.
+
+    Built straight from the JSON entries. Daily temperatures use the day value for `temp` and
+    `feels_like`, while `temp_min`/`temp_max` hold the daily extremes (hourly: same as `temp`).
+    Missing gusts are NaN, missing rain/snow is 0.
+    """
+
+    __slots__ = (
+        "dt", "temp", "temp_min", "temp_max", "feels_like", "wind_speed", "wind_gust", "pop", "rain", "snow",
+        "code",
+    )
+
+    dt: np.ndarray
+    temp: np.ndarray
+    temp_min: np.ndarray
+    temp_max: np.ndarray
+    feels_like: np.ndarray
+    wind_speed: np.ndarray
+    wind_gust: np.ndarray
+    pop: np.ndarray
+    rain: np.ndarray
+    snow: np.ndarray
+    code: np.ndarray
+
+    def __init__(self, **columns: np.ndarray):
+        for name in self.__slots__:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_entries(cls, items: List[dict]):
+        return cls(
+            dt=_column(items, lambda item: item["dt"], np.int64),
+            temp=_column(items, _temperature("day"), np.float64),
+            temp_min=_column(items, _temperature("min"), np.float64),
+            temp_max=_column(items, _temperature("max"), np.float64),
+            feels_like=_column(items, _feels_like, np.float64),
+            wind_speed=_column(items, lambda item: item["wind_speed"], np.float64),
+            wind_gust=_column(items, lambda item: item.get("wind_gust", np.nan), np.float64),
+            pop=_column(items, lambda item: item.get("pop", 0.0), np.float64),
+            rain=_column(items, lambda item: _precipitation(item.get("rain")), np.float64),
+            snow=_column(items, lambda item: _precipitation(item.get("snow")), np.float64),
+            code=_column(items, _weather_code, np.int16),
+        )
+
+    def __len__(self):
+        return len(self.dt)
+
+    def _select(self, index: slice|np.ndarray):
+        return ForecastColumns(**{name: getattr(self, name)[index] for name in self.__slots__})
+
+    def head(self, count: int):
+        return self._select(slice(0, count))
+
+    def between(self, start: datetime.datetime, end: datetime.datetime):
+        """Entries with start <= dt < end (entries are sorted by time)."""
+        lo, hi = np.searchsorted(self.dt, [int(start.timestamp()), int(end.timestamp())])
+        return self._select(slice(lo, hi))
+
+    @property
+    def groups(self):
+        """Index into CONDITION_GROUPS for every entry."""
+        return CONDITION_GROUP_LOOKUP[np.clip(self.code, 0, len(CONDITION_GROUP_LOOKUP) - 1)]
+
+    def group_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.groups, minlength=len(CONDITION_GROUPS))
+        return {CONDITION_GROUPS[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def dominant_group(self) -> str|None:
+        if not len(self):
+            return None
+        counts = np.bincount(self.groups, minlength=len(CONDITION_GROUPS))
+        return CONDITION_GROUPS[int(np.argmax(counts))]
+
+    def max_wind(self) -> float:
+        """Highest wind speed or gust in the window."""
+        if not len(self):
+            return 0.0
+        return float(np.fmax(self.wind_speed, self.wind_gust).max())
+
+    def count_pop_above(self, threshold: float) -> int:
+        return int(np.count_nonzero(self.pop > threshold))
+
+    def rain_total(self) -> float:
+        return float(self.rain.sum())
+
+    def snow_total(self) -> float:
+        return float(self.snow.sum())
@@ -0,0 +1,189 @@
+import csv
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from .cache import ResponseCache
+from .openweathermap import LatLon
+
+DEFAULT_PATH = os.getenv("GEOCODE_STORE_PATH") or os.path.join(
+    os.path.expanduser("~"), ".cache", "agents", "geocode.sqlite3"
+)
+# Optional CSV gazetteer preloaded into the default store
+DEFAULT_GAZETTEER_PATH = os.getenv("GEOCODE_GAZETTEER_PATH")
+
+# Country names and common aliases, mapped to the ISO 3166 codes OpenWeatherMap uses
+COUNTRY_ALIASES = {
+    "bulgaria": "bg",
+    "united kingdom": "gb",
+    "great britain": "gb",
+    "uk": "gb",
+    "england": "gb",
+    "united states": "us",
+    "united states of america": "us",
+    "usa": "us",
+    "germany": "de",
+    "deutschland": "de",
+    "france": "fr",
+    "spain": "es",
+    "italy": "it",
+    "netherlands": "nl",
+    "holland": "nl",
+    "greece": "gr",
+    "romania": "ro",
+    "turkey": "tr",
+    "serbia": "rs",
+    "north macedonia": "mk",
+    "macedonia": "mk",
+    "russia": "ru",
+    "ukraine": "ua",
+    "poland": "pl",
+    "austria": "at",
+    "switzerland": "ch",
+    "czechia": "cz",
+    "czech republic": "cz",
+    "japan": "jp",
+    "china": "cn",
+    "canada": "ca",
+    "australia": "au",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(query: str):
+    """Canonical form of a location query: "  Sofia ,Bulgaria" -> "sofia,bg"."""
+    parts = [_WHITESPACE.sub(" ", part).strip() for part in query.lower().split(",")]
+    parts = [part for part in parts if part]
+    if len(parts) > 1:
+        parts[-1] = COUNTRY_ALIASES.get(parts[-1], parts[-1])
+    return ",".join(parts)
+
+
+def _read_gazetteer(path: str):
+    rows: List[Tuple[str, float, float, str]] = []
+    with open(path, "rt", encoding="utf-8", newline="") as f:
+        for record in csv.DictReader(f):
+            lat, lon = float(record["lat"]), float(record["lon"])
+            name = record["name"]
+            country = record.get("country")
+            if country:
+                rows.append((normalize(f"{name},{country}"), lat, lon, "gazetteer"))
+            rows.append((normalize(name), lat, lon, "gazetteer"))
+    return rows
+
+
+class GeocodeStore:
+    """Location -> (lat, lon) store shared by processes through SQLite, with an LRU in front.
+
+    The database (and `gazetteer_path`) is only opened on the first lookup, so constructing
+    providers that never geocode leaves no file behind.
+    """
+
+    path: str
+    gazetteer_path: str|None
+    memory: ResponseCache
+    db_hits: int
+    _db: sqlite3.Connection|None
+    _lock: threading.Lock
+
+    _default: "GeocodeStore|None" = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_PATH, memory_size: int = 1024, gazetteer_path: str|None = None):
+        self.path = path
+        self.gazetteer_path = gazetteer_path
+        self.memory = ResponseCache(memory_size)
+        self.db_hits = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    @classmethod
+    def default(cls):
+        """Process-wide store at DEFAULT_PATH, preloaded with DEFAULT_GAZETTEER_PATH if set."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(gazetteer_path=DEFAULT_GAZETTEER_PATH)
+            return cls._default
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold the lock
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "query TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, source TEXT NOT NULL)"
+            )
+            if self.gazetteer_path:
+                self._insert(self._db, _read_gazetteer(self.gazetteer_path))
+        return self._db
+
+    @staticmethod
+    def _insert(db: sqlite3.Connection, rows: List[Tuple[str, float, float, str]]):
+        db.execute("BEGIN")
+        db.executemany("INSERT OR IGNORE INTO geocode VALUES (?, ?, ?, ?)", rows)
+        db.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def load_gazetteer(self, path: str):
+        """Preload a CSV gazetteer with `name,country,lat,lon` columns (header row required).
+
+        Entries never override places already stored. Each place is stored under "name,country"
+        and, if not taken yet, under the bare name.
+        """
+        rows = _read_gazetteer(path)
+        with self._lock:
+            self._insert(self._connection(), rows)
+        return len(rows)
+
+    def get(self, query: str) -> LatLon|None:
+        key = normalize(query)
+        result = self.memory.get(key, float("inf"))
+        if result is not None:
+            return result
+        with self._lock:
+            row = self._connection().execute("SELECT lat, lon FROM geocode WHERE query = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.db_hits += 1
+        result = row[0], row[1]
+        self.memory.put(key, result)
+        return result
+
+    def put(self, query: str, latlon: LatLon, source: str = "api"):
+        key = normalize(query)
+        with self._lock:
+            self._connection().execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", (key, latlon[0], latlon[1], source))
+        self.memory.put(key, latlon)
+
+    def resolve(self, location: str, geocode: Callable[[str], List[Any]]) -> LatLon:
+        """Cached (lat, lon) of `location`, falling back to `geocode` (e.g. OpenWeatherMapApi.geocode)."""
+        result = self.get(location)
+        if result is None:
+            response = geocode(location)
+            if not response:
+                raise ValueError(f"Could not find location: {location}")
+            result = response[0].lat, response[0].lon
+            self.put(location, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._connection().execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+        return {
+            "memory_hits": self.memory.hits,
+            "db_hits": self.db_hits,
+            "misses": self.memory.misses - self.db_hits,
+            "memory_entries": len(self.memory),
+            "stored": stored,
+        }
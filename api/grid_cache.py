@@ -0,0 +1,100 @@
+import math
+import threading
+from typing import Any, Dict, List, Set, Tuple
+
+from .cache import ResponseCache
+from .openweathermap import ExcludeInfo, LatLon, OneCallResponse, OpenWeatherMapApi, OverviewResponse
+
+Cell = Tuple[int, int]
+
+
+class GridCachedApi:
+    """Snaps coordinates to a grid in front of `OpenWeatherMapApi.one_call` and `overview`.
+
+    Every point inside a cell is served the forecast fetched for the cell center, so nearby
+    locations share upstream calls. Other client methods pass straight through.
+
+    Distinct points and cells for `report` are sampled over windows of at most `max_tracked`
+    points, the sample starts over once it is full.
+    """
+
+    api: OpenWeatherMapApi
+    cell_size: float
+    max_age: float
+    cache: ResponseCache
+    lookups: int
+    max_tracked: int
+    _cells: Set[Cell]
+    _points: Set[LatLon]
+    _lock: threading.Lock
+
+    def __init__(self, api: OpenWeatherMapApi, cell_size: float = 0.05, max_age: float = 10 * 60, max_entries: int = 1024,
+                 max_tracked: int = 65536):
+        assert 0 < cell_size <= 1, "Cell size is in degrees and must be in (0, 1]"
+        self.api = api
+        self.cell_size = cell_size
+        self.max_age = max_age
+        self.cache = ResponseCache(max_entries)
+        self.lookups = 0
+        self.max_tracked = max_tracked
+        self._cells = set()
+        self._points = set()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        return getattr(self.api, name)
+
+    def cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def center(self, cell: Cell) -> LatLon:
+        # Rounded so the upstream URL (and its single-flight key) is identical for the whole cell
+        digits = max(0, -math.floor(math.log10(self.cell_size))) + 2
+        return (
+            round((cell[0] + 0.5) * self.cell_size, digits),
+            round((cell[1] + 0.5) * self.cell_size, digits),
+        )
+
+    def _snap(self, lat: float, lon: float):
+        cell = self.cell(lat, lon)
+        with self._lock:
+            self.lookups += 1
+            if len(self._points) >= self.max_tracked:
+                self._cells.clear()
+                self._points.clear()
+            self._cells.add(cell)
+            self._points.add((round(lat, 4), round(lon, 4)))
+        return cell, self.center(cell)
+
+    def one_call(self, lon: float, lat: float, exclude: List[ExcludeInfo] = []) -> OneCallResponse:
+        cell, (center_lat, center_lon) = self._snap(lat, lon)
+        key = ("one_call", cell, tuple(sorted(e.value for e in exclude)))
+        response = self.cache.get(key, self.max_age)
+        if response is None:
+            response = self.api.one_call(lon=center_lon, lat=center_lat, exclude=exclude)
+            self.cache.put(key, response)
+        return response
+
+    def overview(self, lon: float, lat: float) -> OverviewResponse:
+        cell, (center_lat, center_lon) = self._snap(lat, lon)
+        key = ("overview", cell)
+        response = self.cache.get(key, self.max_age)
+        if response is None:
+            response = self.api.overview(lon=center_lon, lat=center_lat)
+            self.cache.put(key, response)
+        return response
+
+    def report(self) -> Dict[str, Any]:
+        """Cache effectiveness for the current cell size, to tune it against the upstream quota."""
+        with self._lock:
+            cells, points = len(self._cells), len(self._points)
+        return {
+            "cell_size": self.cell_size,
+            "lookups": self.lookups,
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "hit_rate": self.cache.hit_rate,
+            "distinct_points": points,
+            "distinct_cells": cells,
+            "points_per_cell": points / cells if cells else 0.0,
+        }
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import datetime
+import os
+import threading
+from typing import List
+
+import numpy as np
+
+from .openweathermap import DaySummaryResponse, OpenWeatherMapApi, Units
+
+EPOCH = datetime.date(1970, 1, 1)
+
+# One row per location and day, `day` counts days since 1970-01-01
+DAY_SUMMARY_DTYPE = np.dtype([
+    ("day", np.int32),
+    ("temp_min", np.float32),
+    ("temp_max", np.float32),
+    ("temp_morning", np.float32),
+    ("temp_afternoon", np.float32),
+    ("temp_evening", np.float32),
+    ("temp_night", np.float32),
+    ("humidity", np.float32),
+    ("pressure", np.float32),
+    ("clouds", np.float32),
+    ("precipitation", np.float32),
+    ("wind_speed", np.float32),
+    ("wind_direction", np.float32),
+])
+
+
+def day_number(date: datetime.date):
+    return (date - EPOCH).days
+
+
+def day_date(number: int):
+    return EPOCH + datetime.timedelta(days=int(number))
+
+
+def _row(response: DaySummaryResponse):
+    return (
+        day_number(response.date),
+        response.temperature.min,
+        response.temperature.max,
+        response.temperature.morning,
+        response.temperature.afternoon,
+        response.temperature.evening,
+        response.temperature.night,
+        response.humidity.afternoon,
+        response.pressure.afternoon,
+        response.clouds.afternoon,
+        response.precipitation.total,
+        response.wind.max.speed,
+        response.wind.max.direction,
+    )
+
+
+class HistoryStore:
+    """On-disk store of daily history, one `.npy` structured array per location and unit system.
+
+    Arrays are sorted by day and can be read through mmap without parsing JSON again. Range
+    queries only fetch the days that are not stored yet.
+    """
+
+    root: str
+    _lock: threading.Lock
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def path(self, lat: float, lon: float, units: Units):
+        return os.path.join(self.root, f"{lat:.4f}_{lon:.4f}_{units.value}.npy")
+
+    def load(self, lat: float, lon: float, units: Units, mmap: bool = True) -> np.ndarray:
+        path = self.path(lat, lon, units)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=DAY_SUMMARY_DTYPE)
+        return np.load(path, mmap_mode="r" if mmap else None)
+
+    def load_range(self, lat: float, lon: float, units: Units, start: datetime.date, end: datetime.date):
+        """Stored rows for start <= day <= end (a view into the mmap)."""
+        rows = self.load(lat, lon, units)
+        lo, hi = np.searchsorted(rows["day"], [day_number(start), day_number(end) + 1])
+        return rows[lo:hi]
+
+    def missing_days(self, lat: float, lon: float, units: Units, start: datetime.date, end: datetime.date):
+        wanted = np.arange(day_number(start), day_number(end) + 1, dtype=np.int32)
+        stored = self.load(lat, lon, units)["day"]
+        return [day_date(day) for day in np.setdiff1d(wanted, stored, assume_unique=True)]
+
+    def write(self, lat: float, lon: float, units: Units, rows: np.ndarray):
+        """Merge `rows` into the stored array, replacing days that already exist."""
+        if not len(rows):
+            return
+        path = self.path(lat, lon, units)
+        with self._lock:
+            existing = self.load(lat, lon, units, mmap=False)
+            merged = np.concatenate([rows, existing])
+            # First occurrence wins, so the new rows replace stored ones
+            _, index = np.unique(merged["day"], return_index=True)
+            merged = merged[index]
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, merged)
+            os.replace(temp_path, path)
+
+    def day_summaries(
+        self,
+        api: OpenWeatherMapApi,
+        lat: float,
+        lon: float,
+        start: datetime.date,
+        end: datetime.date,
+        max_concurrency: int = 8,
+    ) -> np.ndarray:
+        """Daily history for start..end (inclusive), fetching only days missing from the store.
+
+        Missing days are fetched concurrently through `api`, which applies its rate limiter.
+        Fetched days are stored even if others fail, the first failure is raised afterwards.
+        """
+        assert start <= end
+        units = api.units
+        missing = self.missing_days(lat, lon, units, start, end)
+        if missing:
+            rows: List[tuple] = []
+            errors: List[Exception] = []
+            with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="owm-history") as pool:
+                futures = [pool.submit(api.day_summary, lon=lon, lat=lat, date=date) for date in missing]
+                for future in as_completed(futures):
+                    try:
+                        rows.append(_row(future.result()))
+                    except Exception as e:
+                        errors.append(e)
+            self.write(lat, lon, units, np.array(rows, dtype=DAY_SUMMARY_DTYPE))
+            if errors:
+                raise errors[0]
+        return self.load_range(lat, lon, units, start, end)
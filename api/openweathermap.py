@@ -1,10 +1,19 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 import datetime
 from enum import Enum
+from functools import cached_property
+import httpx
 import requests
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
+from .cache import ResponseCache
+from .ratelimit import RateLimiter
+from .singleflight import SingleFlight
+from .tracing import TRACER
+
 
 class Units(Enum):
     STANDARD = "standard"
@@ -29,49 +38,339 @@ SUPPORTED_LANGUAGES = {
 }
 
 
-class OpenWeatherMapApi:
+API_URL = "https://api.openweathermap.org"
+
+LatLon = Tuple[float, float]
+
+# Keys whose numeric values (or every numeric value below them) are temperatures/speeds
+_TEMPERATURE_KEYS = {"temp", "feels_like", "dew_point", "temperature", "temp_min", "temp_max"}
+_SPEED_KEYS = {"wind_speed", "wind_gust", "speed", "gust"}
+_MPS_TO_MPH = 2.2369362920544
+
+
+def _convert_temperature(kelvin: float, units: Units):
+    if units == Units.METRIC:
+        return round(kelvin - 273.15, 2)
+    return round((kelvin - 273.15) * 9 / 5 + 32, 2)
+
+
+def _convert_speed(mps: float, units: Units):
+    if units == Units.IMPERIAL:
+        return round(mps * _MPS_TO_MPH, 2)
+    return mps
+
+
+def convert_units(data, units: Units, kind: str|None = None):
+    """Convert a response fetched in `Units.STANDARD` to `units`, returning a new structure.
+
+    Temperatures go from Kelvin to Celsius/Fahrenheit and wind from m/s to mph for imperial.
+    Visibility and precipitation are metric in every unit system upstream, so they are kept.
+    """
+    if units == Units.STANDARD:
+        return data
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            if key == "units":
+                result[key] = units.value
+            elif key in _TEMPERATURE_KEYS:
+                result[key] = convert_units(value, units, "temperature")
+            elif key in _SPEED_KEYS:
+                result[key] = convert_units(value, units, "speed")
+            else:
+                result[key] = convert_units(value, units, kind)
+        return result
+    if isinstance(data, list):
+        return [convert_units(item, units, kind) for item in data]
+    if kind is not None and isinstance(data, (int, float)) and not isinstance(data, bool):
+        if kind == "temperature":
+            return _convert_temperature(data, units)
+        return _convert_speed(data, units)
+    return data
+
+
+class _OpenWeatherMapApiBase:
     api_key: str
     units: "Units"
     language: str
-    session: requests.Session
-
-    def __init__(self, api_key: str, units: Units = Units.METRIC, language: str = "en"):
+    base_url: str
+    rate_limiter: RateLimiter|None
+    single_flight: SingleFlight
+    local_units: bool
+    response_cache: ResponseCache|None
+    cache_max_age: float
+
+    def __init__(
+        self,
+        api_key: str,
+        units: Units,
+        language: str,
+        base_url: str,
+        rate_limiter: RateLimiter|None,
+        single_flight: SingleFlight|None,
+        local_units: bool,
+        response_cache: ResponseCache|None,
+        cache_max_age: float,
+    ):
         self.api_key = api_key
         self.units = units
         assert language in SUPPORTED_LANGUAGES, f"Unsupported language: {language}"
         self.language = language
-        self.session = requests.Session()
-
-    def _get(self, url: str):
-        schema, netloc, path, params, query, fragment = urlparse(url)
+        self.base_url = base_url.rstrip("/")
+        self.rate_limiter = rate_limiter
+        # Identical requests already in flight share one upstream call. Flights are keyed by the
+        # full URL (credentials, units and language included), so clients may share one instance.
+        self.single_flight = single_flight or SingleFlight()
+        # Fetch in standard units and convert locally, so clients with different units can share
+        # `response_cache` (raw JSON keyed by URL) and single-flight entries
+        self.local_units = local_units
+        self.response_cache = response_cache
+        self.cache_max_age = cache_max_age
+
+    @staticmethod
+    def _unique_locations(locations: Iterable[LatLon]) -> List[LatLon]:
+        return list(dict.fromkeys((lat, lon) for lat, lon in locations))
+
+    def _url(self, path: str):
+        schema, netloc, path, params, query, fragment = urlparse(self.base_url + path)
         if query:
             query += "&"
-        query = f"{query}appid={self.api_key}&units={self.units.value}&lang={self.language}"
-        url = urlunparse((schema, netloc, path, params, query, fragment))
+        units = Units.STANDARD if self.local_units else self.units
+        query = f"{query}appid={self.api_key}&units={units.value}&lang={self.language}"
+        return urlunparse((schema, netloc, path, params, query, fragment))
+
+    def _cached(self, url: str):
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(url, self.cache_max_age)
+
+    def _store(self, url: str, data):
+        if self.response_cache is not None:
+            self.response_cache.put(url, data)
+
+    def _localize(self, data):
+        return convert_units(data, self.units) if self.local_units else data
+
+    @staticmethod
+    def _one_call_path(lon: float, lat: float, exclude: List[ExcludeInfo]):
+        exclude_str = ",".join(e.value for e in exclude)
+        return f"/data/3.0/onecall?lat={lat}&lon={lon}&exclude={exclude_str}"
+
+    @staticmethod
+    def _timemachine_path(lon: float, lat: float, dt: datetime.datetime):
+        return f"/data/3.0/onecall?lat={lat}&lon={lon}&dt={int(dt.timestamp())}"
+
+    @staticmethod
+    def _day_summary_path(lon: float, lat: float, date: datetime.date):
+        return f"/data/3.0/onecall?lat={lat}&lon={lon}&dt={date.isoformat()}"
+
+    @staticmethod
+    def _overview_path(lon: float, lat: float):
+        return f"/data/2.5/weather?lat={lat}&lon={lon}"
+
+    @staticmethod
+    def _geocode_path(query: str, limit: int):
+        assert limit <= 5
+        return f"/geo/1.0/direct?q={query}&limit={limit}"
+
+
+class OpenWeatherMapApi(_OpenWeatherMapApiBase):
+    session: requests.Session
+
+    def __init__(
+        self,
+        api_key: str,
+        units: Units = Units.METRIC,
+        language: str = "en",
+        base_url: str = API_URL,
+        rate_limiter: RateLimiter|None = None,
+        single_flight: SingleFlight|None = None,
+        local_units: bool = False,
+        response_cache: ResponseCache|None = None,
+        cache_max_age: float = 10 * 60,
+    ):
+        super().__init__(
+            api_key, units, language, base_url, rate_limiter, single_flight, local_units, response_cache, cache_max_age
+        )
+        self.session = requests.Session()
+
+    def _get(self, path: str):
+        with TRACER.span("openweathermap", "http", endpoint=urlparse(path).path) as span:
+            url = self._url(path)
+            data = self._cached(url)
+            span.set(cached=data is not None)
+            if data is None:
+                data = self.single_flight.do(url, lambda: self._fetch(url))
+            return self._localize(data)
+
+    def _fetch(self, url: str):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
         response = self.session.get(url)
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        self._store(url, data)
+        return data
 
     def one_call(self, lon: float, lat: float, exclude: List[ExcludeInfo] = []):
-        exclude_str = ",".join(e.value for e in exclude)
-        data = self._get(f"https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&exclude={exclude_str}")
+        data = self._get(self._one_call_path(lon, lat, exclude))
         return OneCallResponse(data)
 
+    def one_call_many(
+        self,
+        locations: Iterable[LatLon],
+        exclude: List[ExcludeInfo] = [],
+        max_concurrency: int = 8,
+        return_exceptions: bool = False,
+    ) -> Iterator[Tuple[LatLon, "OneCallResponse|Exception"]]:
+        """Fetch `one_call` for many (lat, lon) pairs, yielding results as they complete.
+
+        Repeated coordinates are fetched once. Requests are throttled by `rate_limiter`, if set.
+        """
+        assert max_concurrency > 0
+        pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="owm")
+        try:
+            futures = {
+                pool.submit(self.one_call, lon=lon, lat=lat, exclude=exclude): (lat, lon)
+                for lat, lon in self._unique_locations(locations)
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    yield futures[future], e
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
     def timemachine(self, lon: float, lat: float, dt: datetime.datetime):
-        data = self._get(f"https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&dt={int(dt.timestamp())}")
+        data = self._get(self._timemachine_path(lon, lat, dt))
         return TimemachineResponse(data)
 
     def day_summary(self, lon: float, lat: float, date: datetime.date):
-        data = self._get(f"https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&dt={date.isoformat()}")
+        data = self._get(self._day_summary_path(lon, lat, date))
         return DaySummaryResponse(data)
     
     def overview(self, lon: float, lat: float):
-        data = self._get(f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}")
+        data = self._get(self._overview_path(lon, lat))
         return OverviewResponse(data)
     
     def geocode(self, query: str, limit: int = 5):
-        assert limit <= 5
-        data = self._get(f"http://api.openweathermap.org/geo/1.0/direct?q={query}&limit={limit}")
+        data = self._get(self._geocode_path(query, limit))
+        return [GeocodeResponse(item) for item in data]
+
+
+class AsyncOpenWeatherMapApi(_OpenWeatherMapApiBase):
+    """Asyncio counterpart of `OpenWeatherMapApi`.
+
+    All requests go through one pooled keep-alive `httpx.AsyncClient`, so many sessions can share
+    the same event loop. Every call accepts a `timeout` (seconds) overriding the client default,
+    and cancelling the awaiting task aborts the in-flight request.
+    """
+
+    client: httpx.AsyncClient
+    timeout: float
+
+    def __init__(
+        self,
+        api_key: str,
+        units: Units = Units.METRIC,
+        language: str = "en",
+        base_url: str = API_URL,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        client: httpx.AsyncClient|None = None,
+        rate_limiter: RateLimiter|None = None,
+        single_flight: SingleFlight|None = None,
+        local_units: bool = False,
+        response_cache: ResponseCache|None = None,
+        cache_max_age: float = 10 * 60,
+    ):
+        super().__init__(
+            api_key, units, language, base_url, rate_limiter, single_flight, local_units, response_cache, cache_max_age
+        )
+        self.timeout = timeout
+        if client is None:
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self.client = client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _get(self, path: str, timeout: float|None = None):
+        with TRACER.span("openweathermap", "http", endpoint=urlparse(path).path) as span:
+            url = self._url(path)
+            data = self._cached(url)
+            span.set(cached=data is not None)
+            if data is None:
+                data = await self.single_flight.do_async(url, lambda: self._fetch(url, timeout))
+            return self._localize(data)
+
+    async def _fetch(self, url: str, timeout: float|None):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        response = await self.client.get(url, timeout=self.timeout if timeout is None else timeout)
+        response.raise_for_status()
+        data = response.json()
+        self._store(url, data)
+        return data
+
+    async def one_call(self, lon: float, lat: float, exclude: List[ExcludeInfo] = [], timeout: float|None = None):
+        data = await self._get(self._one_call_path(lon, lat, exclude), timeout)
+        return OneCallResponse(data)
+
+    async def one_call_many(
+        self,
+        locations: Iterable[LatLon],
+        exclude: List[ExcludeInfo] = [],
+        max_concurrency: int = 32,
+        return_exceptions: bool = False,
+        timeout: float|None = None,
+    ) -> AsyncIterator[Tuple[LatLon, "OneCallResponse|Exception"]]:
+        """Async counterpart of `OpenWeatherMapApi.one_call_many`."""
+        assert max_concurrency > 0
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(location: LatLon):
+            lat, lon = location
+            async with semaphore:
+                try:
+                    return location, await self.one_call(lon=lon, lat=lat, exclude=exclude, timeout=timeout)
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    return location, e
+
+        tasks = [asyncio.ensure_future(fetch(location)) for location in self._unique_locations(locations)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def timemachine(self, lon: float, lat: float, dt: datetime.datetime, timeout: float|None = None):
+        data = await self._get(self._timemachine_path(lon, lat, dt), timeout)
+        return TimemachineResponse(data)
+
+    async def day_summary(self, lon: float, lat: float, date: datetime.date, timeout: float|None = None):
+        data = await self._get(self._day_summary_path(lon, lat, date), timeout)
+        return DaySummaryResponse(data)
+
+    async def overview(self, lon: float, lat: float, timeout: float|None = None):
+        data = await self._get(self._overview_path(lon, lat), timeout)
+        return OverviewResponse(data)
+
+    async def geocode(self, query: str, limit: int = 5, timeout: float|None = None):
+        data = await self._get(self._geocode_path(query, limit), timeout)
         return [GeocodeResponse(item) for item in data]
 
 
@@ -288,6 +587,8 @@ class DaySummaryResponse:
 
 
 class WeatherDetails:
+    __slots__ = ("id", "main", "description", "icon")
+
     id: int
     main: str
     description: str
@@ -302,6 +603,11 @@ class WeatherDetails:
 
 class TimemachineResponse:
     class DataPoint:
+        __slots__ = (
+            "dt", "sunrise", "sunset", "temp", "feels_like", "pressure", "humidity", "dew_point", "uvi",
+            "clouds", "visibility", "wind_speed", "wind_deg", "weather",
+        )
+
         dt: int
         sunrise: int
         sunset: int
@@ -337,27 +643,38 @@ class TimemachineResponse:
     lon: float
     timezone: str
     timezone_offset: int
-    data: List[DataPoint]
+    _raw: dict
 
     def __init__(self, data: dict):
         self.lat = data["lat"]
         self.lon = data["lon"]
         self.timezone = data["timezone"]
         self.timezone_offset = data["timezone_offset"]
-        self.data = [TimemachineResponse.DataPoint(item) for item in data["data"]]
+        self._raw = data
+
+    @cached_property
+    def data(self) -> List[DataPoint]:
+        return [TimemachineResponse.DataPoint(item) for item in self._raw["data"]]
 
 
 class OneCallResponse:
     class Rain:
+        __slots__ = ("one_h",)
+
         one_h: float|None
 
         def __init__(self, data: dict):
             self.one_h = data.get("1h")
 
     class Snow(Rain):
-        pass
+        __slots__ = ()
 
     class Current:
+        __slots__ = (
+            "dt", "sunrise", "sunset", "temp", "feels_like", "pressure", "humidity", "dew_point", "clouds",
+            "uvi", "visibility", "wind_speed", "wind_gust", "wind_deg", "rain", "snow", "weather",
+        )
+
         dt: datetime.datetime
         sunrise: datetime.datetime
         sunset: datetime.datetime
@@ -397,6 +714,8 @@ class OneCallResponse:
 
 
     class Minutely:
+        __slots__ = ("dt", "precipitation")
+
         dt: datetime.datetime
         precipitation: float
         
@@ -406,6 +725,11 @@ class OneCallResponse:
 
 
     class Hourly:
+        __slots__ = (
+            "dt", "temp", "feels_like", "pressure", "humidity", "dew_point", "uvi", "clouds", "visibility",
+            "wind_speed", "wind_gust", "wind_deg", "pop", "rain", "snow", "weather",
+        )
+
         dt: datetime.datetime
         temp: float
         feels_like: float
@@ -443,6 +767,8 @@ class OneCallResponse:
 
 
     class DailyFeelsLike:
+        __slots__ = ("morn", "day", "eve", "night")
+
         morn: float
         day: float
         eve: float
@@ -456,6 +782,8 @@ class OneCallResponse:
 
 
     class DailyTemp(DailyFeelsLike):
+        __slots__ = ("min", "max")
+
         min: float
         max: float
 
@@ -466,6 +794,12 @@ class OneCallResponse:
 
 
     class Daily:
+        __slots__ = (
+            "dt", "sunrise", "sunset", "moonrise", "moonset", "moon_phase", "summary", "temp", "feels_like",
+            "pressure", "humidity", "dew_point", "wind_speed", "wind_gust", "wind_deg", "clouds", "uvi",
+            "pop", "rain", "snow", "weather",
+        )
+
         dt: datetime.datetime
         sunrise: datetime.datetime
         sunset: datetime.datetime
@@ -513,6 +847,8 @@ class OneCallResponse:
 
 
     class Alert:
+        __slots__ = ("sender_name", "event", "start", "end", "description", "tags")
+
         sender_name: str
         event: str
         start: datetime.datetime
@@ -533,19 +869,49 @@ class OneCallResponse:
     lon: float
     timezone: str
     timezone_offset: int
-    current: Current|None
-    minutely: List[Minutely]|None
-    hourly: List[Hourly]|None
-    daily: List[Daily]|None
-    alerts: List[Alert]|None
+    _raw: dict
 
+    # Sections are only decoded on first access, most callers read just one of them
     def __init__(self, data: dict):
         self.lat = data["lat"]
         self.lon = data["lon"]
         self.timezone = data["timezone"]
         self.timezone_offset = data["timezone_offset"]
-        self.current = OneCallResponse.Current(data["current"]) if "current" in data else None
-        self.minutely = [OneCallResponse.Minutely(item) for item in data["minutely"]] if "minutely" in data else None
-        self.hourly = [OneCallResponse.Hourly(item) for item in data["hourly"]] if "hourly" in data else None
-        self.daily = [OneCallResponse.Daily(item) for item in data["daily"]] if "daily" in data else None
-        self.alerts = [OneCallResponse.Alert(item) for item in data["alerts"]] if "alerts" in data else None
+        self._raw = data
+
+    @cached_property
+    def current(self) -> Current|None:
+        data = self._raw.get("current")
+        return OneCallResponse.Current(data) if data is not None else None
+
+    @cached_property
+    def minutely(self) -> List[Minutely]|None:
+        data = self._raw.get("minutely")
+        return [OneCallResponse.Minutely(item) for item in data] if data is not None else None
+
+    @cached_property
+    def hourly(self) -> List[Hourly]|None:
+        data = self._raw.get("hourly")
+        return [OneCallResponse.Hourly(item) for item in data] if data is not None else None
+
+    @cached_property
+    def daily(self) -> List[Daily]|None:
+        data = self._raw.get("daily")
+        return [OneCallResponse.Daily(item) for item in data] if data is not None else None
+
+    @cached_property
+    def alerts(self) -> List[Alert]|None:
+        data = self._raw.get("alerts")
+        return [OneCallResponse.Alert(item) for item in data] if data is not None else None
+
+    @cached_property
+    def hourly_columns(self) -> "ForecastColumns|None":
+        from .forecast_columns import ForecastColumns
+        data = self._raw.get("hourly")
+        return ForecastColumns.from_entries(data) if data is not None else None
+
+    @cached_property
+    def daily_columns(self) -> "ForecastColumns|None":
+        from .forecast_columns import ForecastColumns
+        data = self._raw.get("daily")
+        return ForecastColumns.from_entries(data) if data is not None else None
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from typing import Callable, List
+
+
+class TokenBucket:
+    capacity: float
+    rate: float
+    tokens: float
+    updated: float
+
+    def __init__(self, capacity: float, period: float, now: float):
+        """Allow `capacity` acquisitions per `period` seconds, refilled continuously."""
+        assert capacity > 0 and period > 0
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """A set of token buckets that must all have a token before a request may go out."""
+
+    # OneCall 3.0 "One Call by Call" subscription quotas
+    ONE_CALL_PER_MINUTE = 60
+    ONE_CALL_PER_DAY = 1000
+
+    buckets: List[TokenBucket]
+    acquired: int
+    waited: float
+    _clock: Callable[[], float]
+    _lock: threading.Lock
+
+    def __init__(self, *limits: tuple, clock: Callable[[], float] = time.monotonic):
+        """Each limit is a `(max_calls, period_seconds)` pair."""
+        self._clock = clock
+        now = clock()
+        self.buckets = [TokenBucket(calls, period, now) for calls, period in limits]
+        self.acquired = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def one_call(cls, per_minute: int = ONE_CALL_PER_MINUTE, per_day: int = ONE_CALL_PER_DAY):
+        return cls((per_minute, 60), (per_day, 24 * 60 * 60))
+
+    def _try_acquire(self):
+        """Take a token from every bucket, or return how long to wait before retrying."""
+        with self._lock:
+            now = self._clock()
+            for bucket in self.buckets:
+                bucket.refill(now)
+            wait = max((bucket.wait_time() for bucket in self.buckets), default=0.0)
+            if wait <= 0:
+                for bucket in self.buckets:
+                    bucket.tokens -= 1
+                self.acquired += 1
+            else:
+                self.waited += wait
+            return wait
+
+    def acquire(self):
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while (wait := self._try_acquire()) > 0:
+            await asyncio.sleep(wait)
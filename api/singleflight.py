@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Flight:
+    done: threading.Event
+    result: Any
+    error: BaseException|None
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key into one underlying call.
+
+    Works for threads (`do`) and asyncio tasks (`do_async`). Callers arriving while a call for
+    the same key is in flight wait for it and receive its result (or exception).
+    """
+
+    calls: int
+    coalesced: int
+    _flights: Dict[Hashable, _Flight]
+    _tasks: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = loop.create_task(fn())
+                task.add_done_callback(lambda t: self._forget(task_key, t))
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        # A cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: Tuple[asyncio.AbstractEventLoop, Hashable], task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from autogen import Agent, ConversableAgent, OpenAIWrapper
+from autogen.io import IOStream
+import autogen.token_count_utils as token_count_utils
+
+DeltaCallback = Callable[[ConversableAgent, str], None]
+
+
+class DeltaStream:
+    """IOStream passing streamed completion chunks to `on_delta` and everything else to `fallback`.
+
+    autogen's OpenAI client prints every streamed content chunk with `end=""` and `flush=True`,
+    other output (colors, tool execution notices, usage) does not use that combination.
+    """
+
+    on_delta: Callable[[str], None]
+    fallback: IOStream
+
+    def __init__(self, on_delta: Callable[[str], None], fallback: IOStream):
+        self.on_delta = on_delta
+        self.fallback = fallback
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        if end == "" and flush:
+            delta = sep.join(str(o) for o in objects)
+            if delta:
+                self.on_delta(delta)
+            return
+        self.fallback.print(*objects, sep=sep, end=end, flush=flush)
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return self.fallback.input(prompt, password=password)
+
+
+def _countable(model: str):
+    # autogen counts the prompt tokens of streamed completions and fails for models it does not know
+    # (unless autogen-patches/005 is applied)
+    try:
+        token_count_utils.count_token([{"role": "user", "content": ""}], model=model)
+    except NotImplementedError:
+        return False
+    return True
+
+
+def stream_replies(agent: ConversableAgent, on_delta: Callable[[str], None]) -> bool:
+    """Make `agent` stream its LLM replies, passing content deltas to `on_delta` as they arrive.
+
+    Returns whether streaming was enabled, it is not for models autogen cannot count tokens of.
+    Cached completions are not streamed, they only arrive as the finished message.
+    """
+    if not agent.llm_config:
+        return False
+    configs = [agent.llm_config] + list(agent.llm_config.get("config_list") or [])
+    models = [config.get("model") for config in configs]
+    if not all(_countable(model) for model in models if model):
+        return False
+    agent.llm_config["stream"] = True
+    agent.client = OpenAIWrapper(**agent.llm_config)
+
+    def generate_streamed_oai_reply(
+        self: ConversableAgent,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[OpenAIWrapper] = None,
+    ) -> Tuple[bool, Union[str, Dict, None]]:
+        with IOStream.set_default(DeltaStream(on_delta, IOStream.get_default())):
+            return ConversableAgent.generate_oai_reply(self, messages, sender, config)
+
+    async def a_generate_streamed_oai_reply(
+        self: ConversableAgent,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[OpenAIWrapper] = None,
+    ) -> Tuple[bool, Union[str, Dict, None]]:
+        # The stream is picked up here and handed to the executor thread running the request
+        with IOStream.set_default(DeltaStream(on_delta, IOStream.get_default())):
+            return await ConversableAgent.a_generate_oai_reply(self, messages, sender, config)
+
+    agent.replace_reply_func(ConversableAgent.generate_oai_reply, generate_streamed_oai_reply)
+    agent.replace_reply_func(ConversableAgent.a_generate_oai_reply, a_generate_streamed_oai_reply)
+    return True
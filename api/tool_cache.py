@@ -0,0 +1,175 @@
+from functools import wraps
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import ResponseCache
+
+# Set to share memoized tool results between processes through SQLite
+DEFAULT_PATH = os.getenv("TOOL_CACHE_PATH")
+
+
+def memoize(ttl: float, scope: str = "", normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+    """Mark a tool whose result may be reused for `ttl` seconds for the same arguments.
+
+    Tools are keyed by `scope` and name, so same-named tools sharing a cache must be
+    interchangeable. `normalize` maps the call arguments to their canonical form.
+    """
+    def decorator(func: Callable):
+        func.memo_ttl = ttl  # type: ignore[attr-defined]
+        func.memo_scope = scope  # type: ignore[attr-defined]
+        func.memo_normalize = normalize  # type: ignore[attr-defined]
+        return func
+    return decorator
+
+
+def _normalize_value(value: Any):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+class ToolResultCache:
+    """Results of memoized tools, keyed by (scope, tool name, normalized arguments).
+
+    Kept in a bounded in-process LRU and, when `path` is given, in a SQLite table shared by
+    worker processes. Only successful calls are stored, stored results must be JSON.
+    """
+
+    path: Optional[str]
+    memory: ResponseCache
+    hits: int
+    misses: int
+    db_hits: int
+    _db: Optional[sqlite3.Connection]
+    _lock: threading.Lock
+
+    _default: "ToolResultCache|None" = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, max_entries: int = 1024):
+        self.path = path
+        self.memory = ResponseCache(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.db_hits = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results (key TEXT PRIMARY KEY, created REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    @classmethod
+    def default(cls):
+        """Process-wide cache, backed by SQLite at TOOL_CACHE_PATH if set."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def key(self, scope: str, name: str, arguments: Dict[str, Any]):
+        return json.dumps([scope, name, _normalize_value(arguments)], sort_keys=True, default=str)
+
+    def get(self, key: str, ttl: float):
+        # Entries carry their wall-clock creation time, which is what processes can agree on
+        now = time.time()
+        entry: Optional[Tuple[float, Any]] = self.memory.get(key, float("inf"))
+        if entry is not None and now - entry[0] <= ttl:
+            return entry
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created, value FROM tool_results WHERE key = ? AND created >= ?", (key, now - ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        self.db_hits += 1
+        entry = row[0], json.loads(row[1])
+        self.memory.put(key, entry)
+        return entry
+
+    def put(self, key: str, value: Any):
+        created = time.time()
+        self.memory.put(key, (created, value))
+        if self._db is None:
+            return
+        try:
+            data = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?)", (key, created, data))
+
+    def purge(self, max_age: float):
+        """Drop shared entries older than `max_age` seconds (the longest TTL in use)."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute("DELETE FROM tool_results WHERE created < ?", (time.time() - max_age,)).rowcount
+
+    def wrap(self, func: Callable):
+        """Memoizing wrapper for tools marked with `memoize`, other tools are returned as is."""
+        ttl = getattr(func, "memo_ttl", None)
+        if ttl is None:
+            return func
+        scope = getattr(func, "memo_scope", "")
+        normalize = getattr(func, "memo_normalize", None)
+        signature = inspect.signature(func)
+
+        def lookup(args, kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            # Toolset functions take the agent first, results are shared between agents
+            arguments = {name: value for name, value in bound.arguments.items() if name != "self"}
+            if normalize is not None:
+                arguments = normalize(arguments)
+            key = self.key(scope, func.__name__, arguments)
+            entry = self.get(key, ttl)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return key, entry
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def a_memoized(*args, **kwargs):
+                key, entry = lookup(args, kwargs)
+                if entry is not None:
+                    return entry[1]
+                result = await func(*args, **kwargs)
+                self.put(key, result)
+                return result
+            return a_memoized
+
+        @wraps(func)
+        def memoized(*args, **kwargs):
+            key, entry = lookup(args, kwargs)
+            if entry is not None:
+                return entry[1]
+            result = func(*args, **kwargs)
+            self.put(key, result)
+            return result
+        return memoized
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "db_hits": self.db_hits,
+            "memory_entries": len(self.memory),
+        }
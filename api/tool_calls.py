@@ -0,0 +1,271 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from autogen import Agent, ConversableAgent
+
+
+def not_thread_safe(func: Callable):
+    """Mark a tool so it only runs once the other tool calls of the message are done.
+
+    Calls that timed out may still be running in the background by then.
+    """
+    func.thread_safe = False  # type: ignore[attr-defined]
+    return func
+
+
+def is_thread_safe(func: Optional[Callable]):
+    return getattr(func, "thread_safe", True)
+
+
+class ToolCallPool:
+    """Runs the tool calls of one assistant message concurrently, results keep the call order.
+
+    Plain tools run on a thread pool, coroutine tools as asyncio tasks. Tools marked with
+    `not_thread_safe` run one after another once those are done, on the calling thread (`run`) or
+    on a single dedicated worker (`a_run`, so the event loop is not blocked). A call that runs for more than
+    `timeout` seconds (counted from when it starts, not while it waits for a worker) is answered
+    with an error, its thread is left to finish in the background. Calls still waiting while every
+    worker is held by such calls are cancelled and answered with the same error.
+    """
+
+    max_workers: int
+    timeout: Optional[float]
+    executor: ThreadPoolExecutor
+    serial_executor: ThreadPoolExecutor
+    _stuck: List[Future]
+    _stuck_lock: threading.Lock
+
+    def __init__(self, max_workers: int = 4, timeout: Optional[float] = None):
+        assert max_workers > 0, "Tool pool needs at least one worker"
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Created up front, autogen keeps shallow copies of reply configs and they must share it.
+        # Threads are only started once calls come in.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-call")
+        self.serial_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tool-call-serial")
+        # Timed out calls that still hold a worker
+        self._stuck = []
+        self._stuck_lock = threading.Lock()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        self.serial_executor.shutdown(wait=False)
+
+    def attach(self, agent: ConversableAgent):
+        """Take over tool call replies of `agent` (runs before its default sequential reply)."""
+        agent.register_reply([Agent, None], generate_parallel_tool_calls_reply, config=self)
+        agent.register_reply(
+            [Agent, None], a_generate_parallel_tool_calls_reply, config=self, ignore_async_in_sync_chat=True
+        )
+
+    def _timed_out(self, function_call: Dict):
+        return {"content": f"Error: Function {function_call.get('name', '')} timed out after {self.timeout}s"}
+
+    def _submit(self, fn: Callable, *args):
+        # Keep context variables (e.g. the IOStream) inside the worker thread
+        return self.executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _workers_stuck(self, future: Optional[Future] = None):
+        """Track `future` as timed out, True when timed out calls hold every worker."""
+        with self._stuck_lock:
+            self._stuck = [stuck for stuck in self._stuck if not stuck.done()]
+            if future is not None and not future.done():
+                self._stuck.append(future)
+            return len(self._stuck) >= self.max_workers
+
+    def _submit_timed(
+        self, agent: ConversableAgent, call: Dict, i: int, started: Dict[int, float], condition: threading.Condition
+    ):
+        """Submit one call, its start time is recorded in `started[i]` once a worker picks it up."""
+        def execute():
+            with condition:
+                started[i] = time.monotonic()
+                condition.notify_all()
+            return agent.execute_function(call)
+
+        def finished(_: Future):
+            with condition:
+                condition.notify_all()
+
+        future = self._submit(execute)
+        future.add_done_callback(finished)
+        return future
+
+    def _collect(
+        self,
+        function_calls: List[Dict],
+        threaded: List[Tuple[int, Future]],
+        started: Dict[int, float],
+        condition: threading.Condition,
+        results: List[Any],
+    ):
+        """Wait for the threaded calls, each one is timed from when it started."""
+        if self.timeout is None:
+            for i, future in threaded:
+                _, results[i] = future.result()
+            return
+        pending = dict(threaded)
+        with condition:
+            while pending:
+                now = time.monotonic()
+                for i, future in list(pending.items()):
+                    start = started.get(i)
+                    if future.done():
+                        _, results[i] = future.result()
+                    elif start is not None and now - start >= self.timeout:
+                        self._workers_stuck(future)
+                        results[i] = self._timed_out(function_calls[i])
+                    else:
+                        continue
+                    del pending[i]
+                if not pending:
+                    break
+                deadlines = [started[i] + self.timeout for i in pending if i in started]
+                if not deadlines and self._workers_stuck():
+                    # Nothing can start while timed out calls hold every worker
+                    for i, future in list(pending.items()):
+                        if future.cancel():
+                            results[i] = self._timed_out(function_calls[i])
+                            del pending[i]
+                    if not pending:
+                        break
+                # Re-checked at least every `timeout` seconds, workers held by other batches free up unnoticed
+                condition.wait(min(deadlines) - now if deadlines else self.timeout)
+
+    async def _a_execute(self, agent: ConversableAgent, function_call: Dict):
+        try:
+            _, result = await asyncio.wait_for(agent.a_execute_function(function_call), self.timeout)
+        except asyncio.TimeoutError:
+            result = self._timed_out(function_call)
+        return result
+
+    async def _a_execute_all(self, agent: ConversableAgent, function_calls: List[Dict]):
+        return await asyncio.gather(*(self._a_execute(agent, call) for call in function_calls))
+
+    def run(self, agent: ConversableAgent, function_calls: List[Dict]) -> List[Dict]:
+        results: List[Any] = [None] * len(function_calls)
+        threaded: List[Tuple[int, Future]] = []
+        serial: List[int] = []
+        coroutines: List[int] = []
+        started: Dict[int, float] = {}
+        condition = threading.Condition()
+        for i, call in enumerate(function_calls):
+            func = agent.function_map.get(call.get("name", None))
+            if not is_thread_safe(func):
+                serial.append(i)
+            elif inspect.iscoroutinefunction(func):
+                coroutines.append(i)
+            else:
+                threaded.append((i, self._submit_timed(agent, call, i, started, condition)))
+        # Coroutine tools share one event loop on a worker and time out individually there
+        coroutine_future = None
+        if coroutines:
+            calls = [function_calls[i] for i in coroutines]
+            coroutine_future = self._submit(asyncio.run, self._a_execute_all(agent, calls))
+
+        self._collect(function_calls, threaded, started, condition, results)
+        if coroutine_future is not None:
+            for i, result in zip(coroutines, coroutine_future.result()):
+                results[i] = result
+        for i in serial:
+            _, results[i] = agent.execute_function(function_calls[i])
+        return results
+
+    async def a_run(self, agent: ConversableAgent, function_calls: List[Dict]) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+
+        async def execute(call: Dict):
+            func = agent.function_map.get(call.get("name", None))
+            if inspect.iscoroutinefunction(func):
+                return await self._a_execute(agent, call)
+            started = asyncio.Event()
+
+            def run_call():
+                loop.call_soon_threadsafe(started.set)
+                return agent.execute_function(call)
+
+            future = self._submit(run_call)
+            if self.timeout is None:
+                _, result = await asyncio.wrap_future(future)
+                return result
+            # The timeout starts once a worker picks the call up
+            while not started.is_set():
+                try:
+                    await asyncio.wait_for(started.wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    if self._workers_stuck() and future.cancel():
+                        return self._timed_out(call)
+            try:
+                _, result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+            except asyncio.TimeoutError:
+                self._workers_stuck(future)
+                result = self._timed_out(call)
+            return result
+
+        results: List[Any] = [None] * len(function_calls)
+        concurrent: List[int] = []
+        serial: List[int] = []
+        for i, call in enumerate(function_calls):
+            if is_thread_safe(agent.function_map.get(call.get("name", None))):
+                concurrent.append(i)
+            else:
+                serial.append(i)
+        values = await asyncio.gather(*(execute(function_calls[i]) for i in concurrent))
+        for i, result in zip(concurrent, values):
+            results[i] = result
+        for i in serial:
+            future = self.serial_executor.submit(contextvars.copy_context().run, agent.execute_function, function_calls[i])
+            _, results[i] = await asyncio.wrap_future(future)
+        return results
+
+
+def _tool_responses(agent: ConversableAgent, tool_calls: List[Dict], results: List[Dict]):
+    tool_returns = []
+    for tool_call, result in zip(tool_calls, results):
+        content = result.get("content", "")
+        response = {"role": "tool", "content": "" if content is None else content}
+        if tool_call.get("id", None) is not None:
+            response["tool_call_id"] = tool_call["id"]
+        tool_returns.append(response)
+    return {
+        "role": "tool",
+        "tool_responses": tool_returns,
+        "content": "\n\n".join([agent._str_for_tool_response(tool_return) for tool_return in tool_returns]),
+    }
+
+
+def generate_parallel_tool_calls_reply(
+    agent: ConversableAgent,
+    messages: Optional[List[Dict]] = None,
+    sender: Optional[Agent] = None,
+    config: Optional[ToolCallPool] = None,
+) -> Tuple[bool, Union[Dict, None]]:
+    """Like ConversableAgent.generate_tool_calls_reply, with the calls run through `config`."""
+    if messages is None:
+        messages = agent._oai_messages[sender]
+    tool_calls = messages[-1].get("tool_calls") or []
+    # A single call without a timeout gains nothing from the pool, leave it to the default reply
+    if config is None or not tool_calls or (len(tool_calls) < 2 and config.timeout is None):
+        return False, None
+    results = config.run(agent, [tool_call.get("function", {}) for tool_call in tool_calls])
+    return True, _tool_responses(agent, tool_calls, results)
+
+
+async def a_generate_parallel_tool_calls_reply(
+    agent: ConversableAgent,
+    messages: Optional[List[Dict]] = None,
+    sender: Optional[Agent] = None,
+    config: Optional[ToolCallPool] = None,
+) -> Tuple[bool, Union[Dict, None]]:
+    if messages is None:
+        messages = agent._oai_messages[sender]
+    tool_calls = messages[-1].get("tool_calls") or []
+    if config is None or not tool_calls or (len(tool_calls) < 2 and config.timeout is None):
+        return False, None
+    results = await config.a_run(agent, [tool_call.get("function", {}) for tool_call in tool_calls])
+    return True, _tool_responses(agent, tool_calls, results)
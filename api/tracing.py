@@ -0,0 +1,333 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import datetime
+from functools import wraps
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+class Span:
+    """One timed step (agent turn, LLM completion, tool call, HTTP request), nested by `parent_id`."""
+
+    __slots__ = ("span_id", "parent_id", "trace_id", "name", "kind", "start", "end", "attributes")
+
+    span_id: int
+    parent_id: Optional[int]
+    trace_id: int
+    name: str
+    kind: str
+    start: float
+    end: Optional[float]
+    attributes: Dict[str, Any]
+
+    def __init__(self, span_id: int, parent: Optional["Span"], name: str, kind: str, start: float, attributes: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else span_id
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end = None
+        self.attributes = attributes
+
+    @property
+    def duration(self):
+        return 0.0 if self.end is None else self.end - self.start
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    # Handed out while nothing is exported, so instrumented code never checks
+    def set(self, **attributes: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Exporter(ABC):
+    @abstractmethod
+    def export(self, span: Span):
+        ...
+
+
+class JsonlExporter(Exporter):
+    """Appends finished spans to a JSON lines file."""
+
+    path: str
+    _lock: threading.Lock
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class RingBufferExporter(Exporter):
+    """Keeps the last `size` finished spans in memory."""
+
+    _spans: Deque[Span]
+    _lock: threading.Lock
+
+    def __init__(self, size: int = 1024):
+        self._spans = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self, trace_id: Optional[int] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span.trace_id == trace_id]
+        return spans
+
+
+def _escape_label(value: Any):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusExporter(Exporter):
+    """Aggregates spans into counters, rendered in the Prometheus text format by `render`."""
+
+    prefix: str
+    _durations: Dict[Tuple[str, str], List[float]]
+    _tokens: Dict[Tuple[str, str], int]
+    _lock: threading.Lock
+
+    def __init__(self, prefix: str = "agents"):
+        self.prefix = prefix
+        self._durations = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            # [count, sum, errors]
+            stats = self._durations.setdefault((span.kind, span.name), [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += span.duration
+            if "error" in span.attributes:
+                stats[2] += 1
+            model = span.attributes.get("model")
+            if model:
+                for kind in ("prompt", "completion"):
+                    tokens = span.attributes.get(f"{kind}_tokens")
+                    if tokens:
+                        self._tokens[(model, kind)] = self._tokens.get((model, kind), 0) + tokens
+
+    @staticmethod
+    def _labels(**labels: str):
+        return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+    def render(self):
+        p = self.prefix
+        with self._lock:
+            durations = sorted(self._durations.items())
+            tokens = sorted(self._tokens.items())
+        lines = [f"# TYPE {p}_span_seconds summary"]
+        for (kind, name), (count, total, _) in durations:
+            labels = self._labels(kind=kind, name=name)
+            lines.append(f"{p}_span_seconds_count{labels} {count}")
+            lines.append(f"{p}_span_seconds_sum{labels} {total}")
+        lines.append(f"# TYPE {p}_span_errors_total counter")
+        for (kind, name), (_, _, errors) in durations:
+            lines.append(f"{p}_span_errors_total{self._labels(kind=kind, name=name)} {errors}")
+        lines.append(f"# TYPE {p}_llm_tokens_total counter")
+        for (model, kind), count in tokens:
+            lines.append(f"{p}_llm_tokens_total{self._labels(model=model, type=kind)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """Records nested spans and hands finished ones to its exporters.
+
+    The current span follows the context (threads started through `contextvars.copy_context`
+    and asyncio tasks keep their parent). Without exporters, spans are not recorded at all.
+    """
+
+    exporters: List[Exporter]
+    _clock: Callable[[], float]
+    _ids: Iterator[int]
+    _current: ContextVar[Optional[Span]]
+
+    def __init__(self, exporters: Optional[List[Exporter]] = None, clock: Callable[[], float] = time.time):
+        self.exporters = list(exporters or [])
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self._current = ContextVar(f"tracer_span_{id(self)}", default=None)
+
+    def add_exporter(self, exporter: Exporter):
+        self.exporters.append(exporter)
+
+    @property
+    def current(self):
+        return self._current.get()
+
+    def _finish(self, span: Span):
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any):
+        if not self.exporters:
+            yield _NOOP_SPAN
+            return
+        span = Span(next(self._ids), self._current.get(), name, kind, self._clock(), attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._current.reset(token)
+            span.end = self._clock()
+            self._finish(span)
+
+    def record(self, name: str, kind: str, start: float, end: float, **attributes: Any):
+        """Add a span that already finished (e.g. reported by a callback afterwards)."""
+        if not self.exporters:
+            return
+        span = Span(next(self._ids), self._current.get(), name, kind, start, attributes)
+        span.end = end
+        self._finish(span)
+
+    def wrap(self, func: Callable, kind: str = "tool", name: Optional[str] = None):
+        """`func` with every call recorded as a span, keeps the signature for autogen's schemas."""
+        name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def a_traced(*args, **kwargs):
+                with self.span(name, kind):
+                    return await func(*args, **kwargs)
+            return a_traced
+
+        @wraps(func)
+        def traced(*args, **kwargs):
+            with self.span(name, kind):
+                return func(*args, **kwargs)
+        return traced
+
+
+# Process-wide tracer used by the agents and API clients, add exporters to turn it on
+TRACER = Tracer()
+
+
+def _parse_timestamp(value: str):
+    # autogen reports request start times as UTC "%Y-%m-%d %H:%M:%S.%f"
+    return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class TracingLogger:
+    """autogen runtime logger turning every chat completion into a span of `tracer`.
+
+    Covers all LLM calls made through autogen (group chat speaker selection, inner assistants,
+    web surfer, ...). Start it with `autogen.runtime_logging.start(logger=TracingLogger())`.
+    """
+
+    tracer: Tracer
+
+    def __init__(self, tracer: Tracer = TRACER):
+        self.tracer = tracer
+
+    def start(self) -> str:
+        return "tracing"
+
+    def log_chat_completion(
+        self,
+        invocation_id: Any,
+        client_id: int,
+        wrapper_id: int,
+        agent: Any,
+        request: Dict[str, Any],
+        response: Any,
+        is_cached: int,
+        cost: float,
+        start_time: str,
+    ) -> None:
+        attributes: Dict[str, Any] = {
+            "agent": getattr(agent, "name", agent),
+            "model": request.get("model"),
+            "cached": bool(is_cached),
+            "cost": cost,
+        }
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            attributes["prompt_tokens"] = usage.prompt_tokens
+            attributes["completion_tokens"] = usage.completion_tokens
+        if isinstance(response, str):
+            attributes["error"] = response
+        self.tracer.record("chat_completion", "llm", _parse_timestamp(start_time), time.time(), **attributes)
+
+    def log_new_agent(self, agent: Any, init_args: Dict[str, Any]) -> None:
+        pass
+
+    def log_event(self, source: Any, name: str, **kwargs: Any) -> None:
+        pass
+
+    def log_new_wrapper(self, wrapper: Any, init_args: Dict[str, Any]) -> None:
+        pass
+
+    def log_new_client(self, client: Any, wrapper: Any, init_args: Dict[str, Any]) -> None:
+        pass
+
+    def log_function_use(self, source: Any, function: Any, args: Dict[str, Any], returns: Any) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def get_connection(self) -> None:
+        return None
+
+
+def trace_group_chat(group_chat: Any, tracer: Tracer = TRACER):
+    """Record speaker selection of an autogen GroupChat as spans."""
+    select_speaker = group_chat.select_speaker
+    a_select_speaker = group_chat.a_select_speaker
+
+    def traced_select_speaker(*args, **kwargs):
+        with tracer.span("select_speaker", "group_chat") as span:
+            speaker = select_speaker(*args, **kwargs)
+            span.set(speaker=speaker.name)
+            return speaker
+
+    async def a_traced_select_speaker(*args, **kwargs):
+        with tracer.span("select_speaker", "group_chat") as span:
+            speaker = await a_select_speaker(*args, **kwargs)
+            span.set(speaker=speaker.name)
+            return speaker
+
+    group_chat.select_speaker = traced_select_speaker
+    group_chat.a_select_speaker = a_traced_select_speaker
@@ -6,3 +6,5 @@ admin.site.register(models.Agent)
 admin.site.register(models.Session)
 admin.site.register(models.Message)
 admin.site.register(models.MessageFile)
+admin.site.register(models.TeamConfig)
+admin.site.register(models.Job)
@@ -1,10 +1,15 @@
 from autogen import Agent, AssistantAgent, ConversableAgent, UserProxyAgent
 import copy
-from functools import wraps
-import inspect
 from typing import Callable, ClassVar, Dict, List, Literal, Optional, Tuple, Union
 from autogen import OpenAIWrapper
+from api.completion_cache import CompletionCache
+from api.context_window import ContextWindow, model_from_config
+from api.streaming import DeltaCallback, stream_replies
+from api.tool_cache import ToolResultCache
+from api.tool_calls import ToolCallPool
+from api.tracing import TRACER
 from . import toolset
+from .toolset import CompiledTool
 
 
 class AutogenAgent(ConversableAgent):
@@ -25,6 +30,14 @@ class AutogenAgent(ConversableAgent):
         default_auto_reply: Union[str, Dict] = "",
         description: Optional[str] = None,
         chat_messages: Optional[Dict[Agent, List[Dict]]] = None,
+        incremental_history: bool = True,
+        context_budget: Optional[int] = None,
+        context_summarizer: Optional[Callable[[List[Dict]], str]] = None,
+        tool_concurrency: int = 4,
+        tool_timeout: Optional[float] = None,
+        tool_cache: Optional[ToolResultCache] = None,
+        completion_cache: Optional[CompletionCache] = None,
+        on_delta: Optional[DeltaCallback] = None,
     ):
         if len(toolsets) == 1:
             main_set = toolset.find(toolsets[0])
@@ -50,6 +63,20 @@ class AutogenAgent(ConversableAgent):
 
         inner_llm_config = copy.deepcopy(llm_config)
 
+        # The assistant starts out with every toolset schema (compiled once per toolset), registering
+        # them one by one would rebuild its client for each
+        tools: List[CompiledTool] = []
+        if inner_llm_config not in [None, False]:
+            tools = self._toolset_tools(toolsets)
+            if tools:
+                inner_llm_config["tools"] = inner_llm_config.get("tools", []) + [tool.schema for tool in tools]
+
+        # Keep the inner history between turns and only append new outer messages
+        self._incremental_history = incremental_history
+        self._inner_synced = 0
+        self._inner_first: Optional[Dict] = None
+        self._inner_last: Optional[Dict] = None
+
         # Does the decision making
         self._assistant = AssistantAgent(
             self.name + "_inner_assistant",
@@ -58,6 +85,25 @@ class AutogenAgent(ConversableAgent):
             is_termination_msg=lambda m: False,
         )
 
+        # Completions of the inner assistant are reused for identical requests when a cache is given
+        # (e.g. CompletionCache.default()). autogen's own `cache_seed` still applies otherwise.
+        if inner_llm_config not in [None, False] and completion_cache is not None:
+            self._assistant.client_cache = completion_cache
+
+        self._on_delta: Optional[DeltaCallback] = None
+        self._streaming = False
+        if inner_llm_config not in [None, False] and on_delta is not None:
+            self.stream_to(on_delta)
+
+        # Keeps what the inner assistant sends within the model's window (or `context_budget`)
+        self._context_window = None
+        if inner_llm_config not in [None, False]:
+            self._context_window = ContextWindow.for_model(
+                model_from_config(inner_llm_config), budget=context_budget, summarizer=context_summarizer
+            )
+            if self._context_window is not None:
+                self._context_window.attach(self._assistant)
+
         # plays the role of the API
         self._user_proxy = UserProxyAgent(
             self.name + "_inner_user_proxy",
@@ -67,40 +113,104 @@ class AutogenAgent(ConversableAgent):
             is_termination_msg=lambda m: False,
         )
 
-        if inner_llm_config not in [None, False]:
-            self._register_toolsets(toolsets)
+        # Results of tools marked with `memoize`, shared with other agents by default
+        self._tool_cache = tool_cache or ToolResultCache.default()
+
+        # Runs the tool calls of one assistant message side by side, only agents with tools need workers
+        self._tool_pool = None
+        if tools and (tool_concurrency > 1 or tool_timeout is not None):
+            self._tool_pool = ToolCallPool(tool_concurrency, timeout=tool_timeout)
+            self._tool_pool.attach(self._user_proxy)
+
+        self._register_functions([tool.bind(self) for tool in tools])
 
         self.register_reply([Agent, None], self.__class__.generate_api_reply, remove_other_reply_funcs=True)
+        self.register_reply([Agent, None], self.__class__.a_generate_api_reply, ignore_async_in_sync_chat=True)
         self.register_reply([Agent, None], ConversableAgent.generate_code_execution_reply)
         self.register_reply([Agent, None], ConversableAgent.generate_function_call_reply)
+        self.register_reply(
+            [Agent, None], ConversableAgent.a_generate_function_call_reply, ignore_async_in_sync_chat=True
+        )
         self.register_reply([Agent, None], ConversableAgent.check_termination_and_human_reply)
+        self.register_reply(
+            [Agent, None], ConversableAgent.a_check_termination_and_human_reply, ignore_async_in_sync_chat=True
+        )
 
-    def _register_toolsets(self, toolsets: List[str]):
-        def wrap_tool(tool):
-            @wraps(tool)
-            def wrapped_tool(*args, **kwargs):
-                return tool(self, *args, **kwargs)
-            return wrapped_tool
+    def _toolset_tools(self, toolsets: List[str]) -> List[CompiledTool]:
+        tools: Dict[str, CompiledTool] = {}
         for set_name in toolsets:
             set = toolset.find(set_name)
             if set.init:
                 set.init(self)
-            functions = []
-            for func in set.functions:
-                if func.__name__ in self.function_map:
+            for tool in set.compiled:
+                if tool.name in self.function_map or tool.name in tools:
                     continue
-                argspec = inspect.getfullargspec(func)
-                if argspec.args and argspec.args[0] == "self":
-                    func = wrap_tool(func)
-                functions.append(func)
-            self._register_functions(functions)
+                tools[tool.name] = tool
+        return list(tools.values())
 
     def _register_functions(self, tools: List[Callable]):
+        """Make tools executable, their schemas are already in the assistant's llm_config."""
         for tool in tools:
-            assert tool.__doc__, f"Tool {tool.__name__} must have a docstring."
-            self._assistant.register_for_llm(description=tool.__doc__)(tool)
+            tool = TRACER.wrap(self._tool_cache.wrap(tool), kind="tool")
             self._user_proxy.register_for_execution()(tool)
 
+    def stream_to(self, on_delta: Optional[DeltaCallback]):
+        """Stream the inner assistant's replies, each delta is passed on as a partial message of this agent.
+
+        Replaces the previous callback, None stops passing deltas on. Replies of models autogen cannot
+        count tokens of are not streamed.
+        """
+        if on_delta is not None and not self._streaming:
+            self._streaming = stream_replies(self._assistant, self._forward_delta)
+        self._on_delta = on_delta
+
+    def _forward_delta(self, delta: str):
+        if self._on_delta is not None:
+            self._on_delta(self, delta)
+
+    def reset(self):
+        """Forget the conversation, clients, tool workers and caches are kept for the next one."""
+        super().reset()  # type: ignore[no-untyped-call]
+        self._assistant.reset()  # type: ignore[no-untyped-call]
+        self._user_proxy.reset()  # type: ignore[no-untyped-call]
+        self._inner_synced = 0
+        self._inner_first = None
+        self._inner_last = None
+        self._on_delta = None
+
+    def close(self):
+        """Release the tool workers, the agent cannot run tools afterwards."""
+        if self._tool_pool is not None:
+            self._tool_pool.shutdown()
+
+    def _sync_inner_history(self, messages: List[Dict]):
+        """Mirror all but the last outer message into the inner assistant.
+
+        When the outer history still starts with the prefix mirrored last turn (checked at its
+        ends), only that turn's inner exchange is dropped and the new messages are appended.
+        Otherwise the inner history is rebuilt from scratch.
+        """
+        count = len(messages) - 1
+        inner = self._assistant.chat_messages[self._user_proxy]
+        synced = self._inner_synced
+        if (
+            self._incremental_history
+            and 0 < synced <= count
+            and synced <= len(inner)
+            and messages[0] == self._inner_first
+            and messages[synced - 1] == self._inner_last
+        ):
+            self._assistant.reset_consecutive_auto_reply_counter()
+            self._assistant.stop_reply_at_receive()
+            del inner[synced:]
+            inner.extend(messages[synced:count])
+        else:
+            self._assistant.reset()  # type: ignore[no-untyped-call]
+            self._assistant.chat_messages[self._user_proxy] = messages[0:count]
+        self._inner_synced = count
+        self._inner_first = dict(messages[0]) if count > 0 else None
+        self._inner_last = dict(messages[count - 1]) if count > 0 else None
+
     def generate_api_reply(
         self,
         messages: Optional[List[Dict[str, str]]] = None,
@@ -112,23 +222,48 @@ class AutogenAgent(ConversableAgent):
             messages = self._oai_messages[sender]
 
         self._user_proxy.reset()  # type: ignore[no-untyped-call]
-        self._assistant.reset()  # type: ignore[no-untyped-call]
 
         # Clone the messages to give context
-        self._assistant.chat_messages[self._user_proxy] = list()
-        history = messages[0 : len(messages) - 1]
-        for message in history:
-            self._assistant.chat_messages[self._user_proxy].append(message)
-
-        self._user_proxy.send(messages[-1]["content"], self._assistant, request_reply=True, silent=True)
-        agent_reply = self._user_proxy.chat_messages[self._assistant][-1]
-        # print("Agent Reply: " + str(agent_reply))
-        proxy_reply = self._user_proxy.generate_reply(
-            messages=self._user_proxy.chat_messages[self._assistant], sender=self._assistant
-        )
+        self._sync_inner_history(messages)
+
+        with TRACER.span("api_reply", "agent", agent=self.name):
+            self._user_proxy.send(messages[-1]["content"], self._assistant, request_reply=True, silent=True)
+            agent_reply = self._user_proxy.chat_messages[self._assistant][-1]
+            # print("Agent Reply: " + str(agent_reply))
+            proxy_reply = self._user_proxy.generate_reply(
+                messages=self._user_proxy.chat_messages[self._assistant], sender=self._assistant
+            )
         # print("Proxy Reply: " + str(proxy_reply))
 
         if proxy_reply == "":  # Was the default reply
             return True, None if agent_reply is None else agent_reply["content"]
         else:
             return True, None if proxy_reply is None else proxy_reply["content"]  # type: ignore[index]
+
+    async def a_generate_api_reply(
+        self,
+        messages: Optional[List[Dict[str, str]]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[OpenAIWrapper] = None,
+    ) -> Tuple[bool, Optional[Union[str, Dict[str, str]]]]:
+        """Generate a reply using autogen.oai without blocking the event loop."""
+        if messages is None:
+            messages = self._oai_messages[sender]
+
+        self._user_proxy.reset()  # type: ignore[no-untyped-call]
+
+        # Clone the messages to give context
+        self._sync_inner_history(messages)
+
+        # The LLM call runs off the loop (autogen's a_generate_oai_reply) and async tools are awaited
+        with TRACER.span("api_reply", "agent", agent=self.name):
+            await self._user_proxy.a_send(messages[-1]["content"], self._assistant, request_reply=True, silent=True)
+            agent_reply = self._user_proxy.chat_messages[self._assistant][-1]
+            proxy_reply = await self._user_proxy.a_generate_reply(
+                messages=self._user_proxy.chat_messages[self._assistant], sender=self._assistant
+            )
+
+        if proxy_reply == "":  # Was the default reply
+            return True, None if agent_reply is None else agent_reply["content"]
+        else:
+            return True, None if proxy_reply is None else proxy_reply["content"]  # type: ignore[index]
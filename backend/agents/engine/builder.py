@@ -1,11 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+import json
+import time
 from typing import Any, Dict, List, Optional, Tuple, Type, Union
 from autogen import ConversableAgent
 from autogen.agentchat.contrib.agent_builder import AgentBuilder
 from autogen.agentchat.contrib.capabilities.agent_capability import AgentCapability
+from termcolor import colored
+from api.completion_cache import CachedClient, CompletionCache
+from api.tracing import TRACER
 
 
 class AgentWithCapabilitiesBuilder(AgentBuilder):
     capabilities: List[AgentCapability]
+    batch_capabilities: bool
+    capability_retries: int
+    max_workers: int
+    # Seconds spent in each phase of the last `build`
+    build_timings: Dict[str, float]
+    _phase_start: Optional[float]
 
     def __init__(
         self,
@@ -17,6 +30,10 @@ class AgentWithCapabilitiesBuilder(AgentBuilder):
         builder_model_tags: Optional[list] = [],
         agent_model_tags: Optional[list] = [],
         max_agents: Optional[int] = 5,
+        completion_cache: Optional[CompletionCache] = None,
+        max_workers: int = 4,
+        batch_capabilities: bool = True,
+        capability_retries: int = 2,
     ):
         super().__init__(
             config_file_or_env=config_file_or_env,
@@ -28,6 +45,16 @@ class AgentWithCapabilitiesBuilder(AgentBuilder):
             max_agents=max_agents,
         )
         self.capabilities = capabilities or []
+        # One builder model call picks the capabilities of the whole team (instead of one per expert)
+        self.batch_capabilities = batch_capabilities
+        self.capability_retries = capability_retries
+        # Experts are expanded side by side, each makes its own builder model calls
+        self.max_workers = max_workers
+        self.build_timings = {}
+        self._phase_start = None
+        # Repeated building tasks reuse the builder model's completions when a cache is given
+        if completion_cache is not None:
+            self.builder_model = CachedClient(self.builder_model, completion_cache)
 
     AGENT_CAPABILITIES_PROMPT = """# Your goal
 Considering the following task, what capabilities should the following expert have (if any).
@@ -71,27 +98,150 @@ For example: YoutubeCapability, WebSurferCapability, ... """
         ]
         return capabilities_list
 
+    AGENT_TEAM_CAPABILITIES_PROMPT = """# Your goal
+Considering the following task, what capabilities should each of the following experts have (if any).
+
+# Task
+{building_task}
+
+# Expert names
+{names}
+
+# Available capabilities
+{capabilities}
+
+# Task requirement
+- Reply only with a JSON object mapping every expert name to the list of its capability names.
+For example: {{"Python_Expert": ["YoutubeCapability", "WebSurferCapability"], "Writing_Expert": []}}"""
+
+    def _parse_team_capabilities(self, reply: str, names: List[str]) -> Dict[str, List[AgentCapability]]:
+        """Capabilities of the experts whose entries are valid, the others are left out."""
+        # Models like to wrap JSON in a code block or a sentence
+        start, end = reply.find("{"), reply.rfind("}")
+        try:
+            entries = json.loads(reply[start:end + 1]) if 0 <= start < end else None
+        except ValueError:
+            entries = None
+        if not isinstance(entries, dict):
+            return {}
+        by_name = {cap.__class__.__name__: cap for cap in self.capabilities}
+        parsed = {}
+        for name in names:
+            entry = entries.get(name)
+            if not isinstance(entry, list) or not all(isinstance(cap, str) and cap.strip() in by_name for cap in entry):
+                continue
+            parsed[name] = [by_name[cap.strip()] for cap in entry]
+        return parsed
+
+    def _build_team_capabilities(self, building_task: str, names: List[str]) -> List[List[AgentCapability]]:
+        """Capabilities of every expert in `names`, asking again only for experts whose entries were invalid."""
+        if not self.capabilities:
+            return [[] for _ in names]
+        print(f"Preparing capabilities for {', '.join(names)}", flush=True)
+        capabilities_text = ", ".join(
+            cap.__class__.__name__
+            for cap in self.capabilities
+        )
+        team: Dict[str, List[AgentCapability]] = {}
+        pending = list(dict.fromkeys(names))
+        for _ in range(1 + self.capability_retries):
+            resp_team_capabilities = (
+                self.builder_model.create(
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": self.AGENT_TEAM_CAPABILITIES_PROMPT.format(
+                                building_task=building_task,
+                                names=", ".join(pending),
+                                capabilities=capabilities_text,
+                            ),
+                        }
+                    ]
+                )
+                .choices[0]
+                .message.content
+            )
+            team.update(self._parse_team_capabilities(resp_team_capabilities or "", pending))
+            pending = [name for name in pending if name not in team]
+            if not pending:
+                break
+        if pending:
+            print(colored(f"No valid capabilities for {', '.join(pending)}, they get none", "yellow"), flush=True)
+        return [team.get(name, []) for name in names]
+
     def _agent_expand_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        config["capabilities"] = self._build_agent_capabilities(config)
+        # Batched capabilities are filled in for the whole team by `_build_agent_configs`
+        if not self.batch_capabilities:
+            config["capabilities"] = [cap.__class__.__name__ for cap in self._build_agent_capabilities(config)]
         super()._agent_expand_config(config)
 
+    def _end_phase(self, phase: str):
+        # Phases follow each other, so each one lasts from the end of the previous one
+        if self._phase_start is None:
+            return
+        now = time.time()
+        self.build_timings[phase] = now - self._phase_start
+        TRACER.record(phase, "build", self._phase_start, now)
+        print(colored(f"==> {phase} took {self.build_timings[phase]:.2f}s", "green"), flush=True)
+        self._phase_start = now
+
+    def build(self, *args, **kwargs) -> Tuple[List[ConversableAgent], Dict]:
+        self.build_timings = {}
+        start = self._phase_start = time.time()
+        try:
+            return super().build(*args, **kwargs)
+        finally:
+            self._phase_start = None
+            self.build_timings["total"] = time.time() - start
+
+    def _build_agent_configs(self, building_task: str, agent_name_list: List[str]) -> List[Dict[str, Any]]:
+        self._end_phase("names")
+        # Results are collected in the order of `agent_name_list` whichever expert finishes first
+        contexts = [copy_context() for _ in agent_name_list]
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(agent_name_list) + self.batch_capabilities)),
+            thread_name_prefix="agent-config",
+        ) as executor:
+            # The team's capabilities only depend on the names, picked while the experts are expanded
+            team_capabilities = None
+            if self.batch_capabilities:
+                team_capabilities = executor.submit(
+                    copy_context().run, self._build_team_capabilities, building_task, agent_name_list
+                )
+            configs = list(executor.map(
+                lambda context, name: context.run(self._build_single_agent_config, building_task, name),
+                contexts,
+                agent_name_list,
+            ))
+            if team_capabilities is not None:
+                for config, capabilities in zip(configs, team_capabilities.result()):
+                    config["capabilities"] = [cap.__class__.__name__ for cap in capabilities]
+        self._end_phase("configs")
+        return configs
+
     def _build_agents(
         self, use_oai_assistant: Optional[bool] = False, user_proxy: Optional[ConversableAgent] = None, **kwargs
     ) -> Tuple[List[ConversableAgent], Dict]:
+        self._end_phase("coding")
         agent_list, cached_configs = super()._build_agents(
             use_oai_assistant=use_oai_assistant, user_proxy=user_proxy, **kwargs
         )
-        for agent, config in zip(agent_list, cached_configs):
-            if not config["capabilities"]:
+        # Configs name the capabilities (they are stored as JSON), each agent gets its own instances
+        for agent, config in zip(agent_list, cached_configs["agent_configs"]):
+            if not config.get("capabilities"):
                 continue
             for cap_class_name in config["capabilities"]:
                 cap_class: Type[AgentCapability]|None = next(
-                    cap
-                    for cap in self.capabilities
-                    if cap.__class__.__name__ == cap_class_name
+                    (
+                        cap.__class__
+                        for cap in self.capabilities
+                        if cap.__class__.__name__ == cap_class_name
+                    ),
+                    None,
                 )
                 if cap_class is None:
                     continue
                 cap = cap_class()
                 cap.add_to_agent(agent)
+        self._end_phase("agents")
         return agent_list, cached_configs
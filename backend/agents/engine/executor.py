@@ -1,19 +1,44 @@
+import copy
 from dataclasses import dataclass
-from typing import Callable
+import json
+import threading
+from typing import Any, Callable, Dict, Sequence
+from autogen import ConversableAgent
+from api.streaming import stream_replies
 from .agent import AutogenAgent
-from .builder import AgentWithToolsBuilder
+from .builder import AgentWithCapabilitiesBuilder
+from .jobs import JobCancelled
+from .team_cache import TEAM_CACHE
+
+# Teams are built and loaded with the same configs, they are not part of the cached team (see TEAM_KEYS)
+DEFAULT_LLM_CONFIG: Dict[str, Any] = {"temperature": 0}
+CODE_EXECUTION_CONFIG: Dict[str, Any] = {"last_n_messages": 1, "work_dir": "groupchat", "use_docker": False, "timeout": 10}
 
 
 @dataclass(frozen=True)
 class Context:
     prompt: str
     on_msg: Callable[[AutogenAgent, str], None]
+    # Receives reply text while it is being generated, `on_msg` still gets the whole message
+    on_delta: Callable[[ConversableAgent, str], None]|None = None
+    # The session's own agents, leased from AGENT_POOL by the caller and released after the task
+    agents: Sequence[AutogenAgent] = ()
+    # Set to stop the task, checked once the team is ready. The conversation itself stops at the
+    # next message or delta, which is up to `on_msg` and `on_delta`.
+    cancelled: threading.Event|None = None
+
+
+def _stream_to(agent: ConversableAgent, on_delta: Callable[[ConversableAgent, str], None]):
+    if isinstance(agent, AutogenAgent):
+        agent.stream_to(on_delta)
+    else:
+        stream_replies(agent, lambda delta: on_delta(agent, delta))
 
 
 def execute_task(context: Context):
-    builder = AgentWithToolsBuilder(
-        toolsets=[],
-        config_File_or_env=None,
+    builder = AgentWithCapabilitiesBuilder(
+        capabilities=[],
+        config_file_or_env=None,
         config_file_location=None,
         builder_model=None,
         agent_model=None,
@@ -21,13 +46,37 @@ def execute_task(context: Context):
         agent_model_tags=None,
         max_agents=5,
     )
-    agent_list, cached_configs = builder.build(
-        building_task=context.prompt,
-        default_llm_config=None,
-        coding=True,
-        code_execution_config=None,
-        use_oai_assistant=False,
-        user_proxy=None,
-        max_agents=None,
-    )
+    default_llm_config = copy.deepcopy(DEFAULT_LLM_CONFIG)
+    code_execution_config = copy.deepcopy(CODE_EXECUTION_CONFIG)
+    # A team built for the same task before is loaded without asking the builder model anything
+    team_config = TEAM_CACHE.find(context.prompt)
+    if team_config is not None:
+        agent_list, cached_configs = builder.load(
+            config_json=json.dumps({
+                "building_task": context.prompt,
+                "default_llm_config": default_llm_config,
+                "code_execution_config": code_execution_config,
+                **team_config,
+            }),
+            use_oai_assistant=False,
+            user_proxy=None,
+        )
+    else:
+        agent_list, cached_configs = builder.build(
+            building_task=context.prompt,
+            default_llm_config=default_llm_config,
+            coding=True,
+            code_execution_config=code_execution_config,
+            use_oai_assistant=False,
+            user_proxy=None,
+            max_agents=None,
+        )
+        TEAM_CACHE.store(context.prompt, cached_configs)
+    # Building the team may take a while, no need to start talking if the job was cancelled meanwhile
+    if context.cancelled is not None and context.cancelled.is_set():
+        raise JobCancelled()
+    agent_list = list(context.agents) + agent_list
+    if context.on_delta is not None:
+        for agent in agent_list:
+            _stream_to(agent, context.on_delta)
     # ...
@@ -0,0 +1,244 @@
+from contextlib import ExitStack
+from datetime import timedelta
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from ..models import Job, Message, Model, Session
+from .live import HUB
+
+if TYPE_CHECKING:
+    from .executor import Context
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def submit(session: Session, prompt: str, model: Optional[Model] = None, priority: int = 0, max_attempts: int = 3) -> Job:
+    """Queue `prompt` for `session`, higher `priority` runs first.
+
+    Without `model` the job counts against the model of the session's first agent.
+    """
+    if model is None:
+        agent = session.agents.exclude(model=None).order_by("pk").first()
+        model = agent.model if agent is not None else None
+    return Job.objects.create(session=session, prompt=prompt, model=model, priority=priority, max_attempts=max_attempts)
+
+
+def cancel(job: Job) -> bool:
+    """Cancel a queued job right away, False if it already ended.
+
+    A running job stops once its team is built or at its next message or streamed delta, whichever
+    comes first. Until then its worker keeps working on it (e.g. waiting for the builder model).
+    """
+    if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(status=Job.CANCELLED, finished=timezone.now()):
+        return True
+    return bool(Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(cancel_requested=True))
+
+
+def recover(stale_after: float) -> int:
+    """Requeue running jobs whose worker stopped sending heartbeats (failing those out of attempts)."""
+    stale = timezone.now() - timedelta(seconds=stale_after)
+    jobs = Job.objects.filter(status=Job.RUNNING, heartbeat__lt=stale)
+    failed = jobs.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, error="Worker lost", finished=timezone.now()
+    )
+    requeued = jobs.filter(attempts__lt=F("max_attempts")).update(status=Job.QUEUED, worker="", heartbeat=None)
+    return failed + requeued
+
+
+def _under_limit(job: Job) -> bool:
+    # Runs inside the claiming transaction, the model row is locked so claims of its jobs are serialized
+    if job.model_id is None:
+        return True
+    model = Model.objects.select_for_update().filter(pk=job.model_id).first()
+    if model is None or model.max_concurrency is None:
+        return True
+    return Job.objects.filter(model_id=job.model_id, status=Job.RUNNING).count() < model.max_concurrency
+
+
+def claim(worker: str, candidates: int = 32) -> Optional[Job]:
+    """Take the most important queued job whose model has a free slot, None if there is none."""
+    with transaction.atomic():
+        queued = Job.objects.filter(status=Job.QUEUED).order_by("-priority", "created")[:candidates]
+        full: Set[int] = set()
+        for job in queued:
+            if job.model_id in full:
+                continue
+            if not _under_limit(job):
+                full.add(job.model_id)
+                continue
+            now = timezone.now()
+            # Another worker may have taken it since it was read
+            if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, worker=worker, heartbeat=now, started=now, attempts=F("attempts") + 1
+            ):
+                job.refresh_from_db()
+                return job
+    return None
+
+
+class WorkerPool:
+    """Runs queued jobs on `concurrency` threads of this process.
+
+    Any number of processes may run pools against the same database. Jobs are claimed by
+    priority, then age, skipping jobs whose model already runs `max_concurrency` jobs. Running
+    jobs send a heartbeat every `heartbeat_interval` seconds, jobs without one for `stale_after`
+    seconds (their worker crashed) are requeued until they run out of attempts.
+    """
+
+    concurrency: int
+    poll_interval: float
+    heartbeat_interval: float
+    stale_after: float
+    name: str
+    _execute: Optional[Callable[["Context"], None]]
+    _stop: threading.Event
+    # Job id -> cancellation flag of the jobs running here
+    _running: Dict[int, threading.Event]
+    _lock: threading.Lock
+    _threads: List[threading.Thread]
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 10.0,
+        stale_after: float = 60.0,
+        execute: Optional[Callable[["Context"], None]] = None,
+    ):
+        assert concurrency > 0, "Worker pool needs at least one worker"
+        assert stale_after > heartbeat_interval, "Jobs would be recovered while they are still running"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._execute = execute
+        self._stop = threading.Event()
+        self._running = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        self._threads.append(threading.Thread(target=self._monitor, name="job-monitor", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, wait: bool = True):
+        """Stop claiming jobs, running jobs are finished first when waiting."""
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def run(self):
+        """Work until interrupted."""
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            print("Stopping, waiting for running jobs...", flush=True)
+        finally:
+            self.stop()
+
+    def _work(self):
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                try:
+                    job = claim(self.name)
+                except DatabaseError:
+                    # Claims of other workers got in the way (SQLite locks the whole database), try again
+                    job = None
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self._run(job)
+        finally:
+            connection.close()
+
+    def _monitor(self):
+        # Heartbeats for jobs running here, cancellation requests and recovery of other workers' jobs
+        # (starting with those left behind by a crash of this host)
+        try:
+            while True:
+                with self._lock:
+                    running = dict(self._running)
+                if self._stop.is_set() and not running:
+                    break
+                close_old_connections()
+                try:
+                    if running:
+                        Job.objects.filter(pk__in=running.keys(), status=Job.RUNNING).update(heartbeat=timezone.now())
+                        cancelled = Job.objects.filter(pk__in=running.keys(), cancel_requested=True)
+                        for job_id in cancelled.values_list("pk", flat=True):
+                            running[job_id].set()
+                    recover(self.stale_after)
+                except DatabaseError as e:
+                    print(f"Job heartbeat failed: {e}", flush=True)
+                if self._stop.is_set():
+                    # Still beating for the jobs finishing up
+                    time.sleep(min(self.poll_interval, self.heartbeat_interval))
+                else:
+                    self._stop.wait(self.heartbeat_interval)
+        finally:
+            connection.close()
+
+    def _run(self, job: Job):
+        # The agent engine (autogen) is only loaded by workers, not by views submitting jobs
+        from .executor import Context, execute_task
+        from .pool import AGENT_POOL
+        execute = self._execute or execute_task
+        cancelled = threading.Event()
+        with self._lock:
+            self._running[job.pk] = cancelled
+        senders = {}
+
+        def on_msg(agent, content: str):
+            if cancelled.is_set():
+                raise JobCancelled()
+            Message.objects.create(session_id=job.session_id, agent=senders.get(agent.name), sender=agent.name, content=content)
+            HUB.notify(job.session_id)
+
+        def on_delta(agent, delta: str):
+            if cancelled.is_set():
+                raise JobCancelled()
+            HUB.publish(job.session_id, {"type": "delta", "sender": agent.name, "delta": delta})
+
+        status, error = Job.DONE, ""
+        try:
+            with ExitStack() as leases:
+                rows = list(job.session.agents.select_related("model"))
+                senders.update((row.name, row) for row in rows)
+                # Warm instances of the session's agents, reset and handed back once the job ends
+                agents = [leases.enter_context(AGENT_POOL.lease(row)) for row in rows]
+                execute(Context(prompt=job.prompt, on_msg=on_msg, on_delta=on_delta, agents=agents, cancelled=cancelled))
+        except JobCancelled:
+            status = Job.CANCELLED
+        except Exception:
+            status, error = Job.FAILED, traceback.format_exc()
+        finally:
+            with self._lock:
+                if self._running.get(job.pk) is cancelled:
+                    del self._running[job.pk]
+        # Only while still ours, it may have been recovered by another worker in the meantime
+        try:
+            Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=self.name).update(
+                status=status, error=error, finished=timezone.now()
+            )
+        except DatabaseError as e:
+            # Left running without heartbeats, so it is recovered and run again
+            print(f"Recording the end of job {job.pk} failed: {e}", flush=True)
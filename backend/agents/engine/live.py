@@ -0,0 +1,179 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from django.db.models import Max
+from ..models import Message
+
+Event = Dict[str, Any]
+
+
+def message_event(message: Message) -> Event:
+    return {"type": "message", "id": message.pk, "sender": message.sender, "content": message.content}
+
+
+class Listener:
+    """One follower of a session, events wait in its queue until it takes them."""
+
+    __slots__ = ("session_id", "queue", "loop", "last_id", "overflowed")
+
+    session_id: int
+    queue: "asyncio.Queue[Event]"
+    loop: asyncio.AbstractEventLoop
+    last_id: int
+    overflowed: bool
+
+    def __init__(self, session_id: int, queue_size: int):
+        self.session_id = session_id
+        self.queue = asyncio.Queue(queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.last_id = 0
+        self.overflowed = False
+
+    def offer(self, event: Event):
+        # Runs on the listener's loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Deltas are lost, messages are read again from the database
+            self.overflowed = True
+
+
+class LiveHub:
+    """Fans messages and partial replies of sessions out to listeners of this process.
+
+    Messages are read from the Message table by one poller shared by all listeners, every
+    `poll_interval` seconds or right away when a job of this process `notify`s it. Deltas are
+    not stored, only those of jobs running in this process are `publish`ed. Idle listeners only
+    cost a queue each.
+    """
+
+    poll_interval: float
+    queue_size: int
+    keepalive: float
+    _listeners: Dict[int, Set[Listener]]
+    _cursor: Optional[int]
+    _poller: "Optional[asyncio.Task]"
+    _wake: Optional[asyncio.Event]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _lock: threading.Lock
+
+    def __init__(self, poll_interval: float = 1.0, queue_size: int = 256, keepalive: float = 15.0):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self._listeners = {}
+        # Highest message id the poller has looked at
+        self._cursor = None
+        self._poller = None
+        self._wake = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def publish(self, session_id: int, event: Event):
+        """Hand `event` to the listeners of `session_id`, callable from any thread."""
+        with self._lock:
+            listeners = list(self._listeners.get(session_id, ()))
+        for listener in listeners:
+            try:
+                listener.loop.call_soon_threadsafe(listener.offer, event)
+            except RuntimeError:
+                # Its loop is closed, it is unsubscribed as the stream is torn down
+                pass
+
+    def notify(self, session_id: int):
+        """A message of `session_id` was stored, callable from any thread."""
+        with self._lock:
+            if session_id not in self._listeners or self._wake is None or self._loop is None:
+                return
+            wake, loop = self._wake, self._loop
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass
+
+    def _subscribe(self, session_id: int) -> Listener:
+        listener = Listener(session_id, self.queue_size)
+        with self._lock:
+            self._listeners.setdefault(session_id, set()).add(listener)
+        if self._poller is None or self._poller.done():
+            loop = asyncio.get_running_loop()
+            with self._lock:
+                self._loop = loop
+                self._wake = asyncio.Event()
+            self._poller = loop.create_task(self._poll())
+        return listener
+
+    def _unsubscribe(self, listener: Listener):
+        with self._lock:
+            listeners = self._listeners.get(listener.session_id)
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    del self._listeners[listener.session_id]
+
+    def _rewind(self, last_id: int):
+        if self._cursor is None or last_id < self._cursor:
+            self._cursor = last_id
+
+    async def _poll(self):
+        while True:
+            with self._lock:
+                sessions = list(self._listeners)
+            if not sessions:
+                self._cursor = None
+                return
+            if self._cursor is None:
+                self._cursor = (await Message.objects.aaggregate(last=Max("pk")))["last"] or 0
+            new = Message.objects.filter(session_id__in=sessions, pk__gt=self._cursor).order_by("pk")
+            async for message in new:
+                self.publish(message.session_id, message_event(message))
+                self._cursor = max(self._cursor, message.pk)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)  # type: ignore[union-attr]
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()  # type: ignore[union-attr]
+
+    async def _catch_up(self, listener: Listener) -> AsyncIterator[Event]:
+        # Anything stored after this point may be missed by the query below, the poller must see it
+        upto = (await Message.objects.aaggregate(last=Max("pk")))["last"] or 0
+        missed = Message.objects.filter(session_id=listener.session_id, pk__gt=listener.last_id).order_by("pk")
+        async for message in missed:
+            listener.last_id = message.pk
+            yield message_event(message)
+        self._rewind(upto)
+
+    async def events(self, session_id: int, after: int = 0) -> AsyncIterator[Optional[Event]]:
+        """Messages of `session_id` after message id `after`, then live messages and deltas.
+
+        Yields None when nothing happened for `keepalive` seconds.
+        """
+        listener = self._subscribe(session_id)
+        listener.last_id = after
+        try:
+            async for event in self._catch_up(listener):
+                yield event
+            while True:
+                if listener.overflowed:
+                    listener.overflowed = False
+                    while not listener.queue.empty():
+                        listener.queue.get_nowait()
+                    async for event in self._catch_up(listener):
+                        yield event
+                try:
+                    event = await asyncio.wait_for(listener.queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["type"] == "message":
+                    # Already caught up on
+                    if event["id"] <= listener.last_id:
+                        continue
+                    listener.last_id = event["id"]
+                yield event
+        finally:
+            self._unsubscribe(listener)
+
+
+# Shared by the streaming views and the job workers of this process
+HUB = LiveHub()
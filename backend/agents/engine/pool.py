@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+from .agent import AutogenAgent
+
+
+def row_key(row) -> Hashable:
+    """Everything of a backend `Agent` row (and its `Model`) that goes into building its agent.
+
+    Editing the row gives a new key, instances built from the old configuration idle out.
+    """
+    model = row.model
+    return (
+        row.name,
+        row.path,
+        row.prompt_override,
+        row.description_override,
+        json.dumps(row.init_kwargs or {}, sort_keys=True, default=str),
+        None if model is None else (model.model, model.api_key, model.base_url),
+    )
+
+
+def agent_from_row(row) -> AutogenAgent:
+    """Build the agent described by a backend `Agent` row, `path` lists its toolsets separated by commas."""
+    llm_config: Dict[str, Any]|bool = False
+    if row.model is not None:
+        config = {"model": row.model.model, "api_key": row.model.api_key}
+        if row.model.base_url:
+            config["base_url"] = row.model.base_url
+        llm_config = {"config_list": [config]}
+    return AutogenAgent(
+        row.name,
+        [name.strip() for name in row.path.split(",") if name.strip()],
+        system_message=row.prompt_override or None,
+        description=row.description_override or None,
+        llm_config=llm_config,
+        **(row.init_kwargs or {}),
+    )
+
+
+class AgentPool:
+    """Warm agent instances, reused between sessions that use the same backend `Agent` row.
+
+    A released agent only has its conversation reset, its clients (LLM, toolset APIs and their
+    connection pools), tool workers and caches stay as they are for the next session. Up to
+    `max_idle_per_key` instances of one configuration and `max_idle` overall are kept, the
+    longest idle go first. Instances idle for more than `idle_timeout` seconds are dropped.
+    """
+
+    max_idle: int
+    max_idle_per_key: int
+    idle_timeout: float
+    created: int
+    reused: int
+    evicted: int
+    _factory: Callable[[Any], AutogenAgent]
+    _key: Callable[[Any], Hashable]
+    _clock: Callable[[], float]
+    # Idle instances by id, oldest release first
+    _idle: "OrderedDict[int, Tuple[Hashable, float, AutogenAgent]]"
+    _idle_per_key: Dict[Hashable, int]
+    _leased: Dict[int, Hashable]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        max_idle: int = 32,
+        max_idle_per_key: int = 4,
+        idle_timeout: float = 10 * 60,
+        factory: Callable[[Any], AutogenAgent] = agent_from_row,
+        key: Callable[[Any], Hashable] = row_key,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        assert max_idle >= 0 and max_idle_per_key >= 0, "Pool sizes cannot be negative"
+        self.max_idle = max_idle
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self._factory = factory
+        self._key = key
+        self._clock = clock
+        self._idle = OrderedDict()
+        self._idle_per_key = {}
+        self._leased = {}
+        self._lock = threading.Lock()
+
+    def _take(self, agent_id: int) -> AutogenAgent:
+        # Callers hold the lock
+        key, _, agent = self._idle.pop(agent_id)
+        self._idle_per_key[key] -= 1
+        if not self._idle_per_key[key]:
+            del self._idle_per_key[key]
+        return agent
+
+    def _drop(self, agent_id: int) -> AutogenAgent:
+        # The returned agent is closed by the caller once the lock is released
+        self.evicted += 1
+        return self._take(agent_id)
+
+    def _expired(self, now: float):
+        expired = []
+        for agent_id, (_, released, _) in self._idle.items():
+            if now - released <= self.idle_timeout:
+                break
+            expired.append(agent_id)
+        return [self._drop(agent_id) for agent_id in expired]
+
+    def acquire(self, row) -> AutogenAgent:
+        """A warm agent for `row`, or a new one if none is idle. Give it back with `release`."""
+        key = self._key(row)
+        agent = None
+        with self._lock:
+            dropped = self._expired(self._clock())
+            # Most recently released first, so rarely needed instances are the ones that idle out
+            for agent_id in reversed(self._idle):
+                if self._idle[agent_id][0] == key:
+                    agent = self._take(agent_id)
+                    self.reused += 1
+                    break
+        for old in dropped:
+            old.close()
+        if agent is None:
+            agent = self._factory(row)
+            with self._lock:
+                self.created += 1
+        with self._lock:
+            self._leased[id(agent)] = key
+        return agent
+
+    def release(self, agent: AutogenAgent):
+        """Reset the conversation of `agent` and keep it for the next `acquire` of its row."""
+        with self._lock:
+            key = self._leased.pop(id(agent))
+        try:
+            agent.reset()
+        except Exception:
+            # Not in a state to be handed out again
+            agent.close()
+            raise
+        with self._lock:
+            now = self._clock()
+            dropped = self._expired(now)
+            if self._idle_per_key.get(key, 0) >= self.max_idle_per_key:
+                dropped.append(agent)
+                self.evicted += 1
+            else:
+                self._idle[id(agent)] = key, now, agent
+                self._idle_per_key[key] = self._idle_per_key.get(key, 0) + 1
+                while len(self._idle) > self.max_idle:
+                    dropped.append(self._drop(next(iter(self._idle))))
+        for old in dropped:
+            old.close()
+
+    @contextmanager
+    def lease(self, row):
+        agent = self.acquire(row)
+        try:
+            yield agent
+        finally:
+            self.release(agent)
+
+    def evict_idle(self) -> int:
+        """Drop instances idle for longer than `idle_timeout`, returns how many were dropped."""
+        with self._lock:
+            dropped = self._expired(self._clock())
+        for agent in dropped:
+            agent.close()
+        return len(dropped)
+
+    def clear(self):
+        with self._lock:
+            dropped = [self._drop(agent_id) for agent_id in list(self._idle)]
+        for agent in dropped:
+            agent.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+                "idle": len(self._idle),
+                "leased": len(self._leased),
+            }
+
+
+# Shared by the backend's sessions
+AGENT_POOL = AgentPool()
@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from django.db.models import F
+from django.utils import timezone
+from api.cache import ResponseCache
+from ..models import TeamConfig
+
+Embed = Callable[[str], Sequence[float]]
+
+# Parts of the builder's configs describing the team, the LLM and code execution configs come from the caller
+TEAM_KEYS = ("agent_configs", "coding")
+
+
+def normalize_prompt(prompt: str):
+    return " ".join(unicodedata.normalize("NFKC", prompt).casefold().split())
+
+
+def prompt_hash(prompt: str):
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+class TeamConfigCache:
+    """Expert teams built by the builder, stored in the database and found again by task prompt.
+
+    Prompts are matched exactly after normalization (case, whitespace, unicode forms). With
+    `embed`, a prompt without an exact match also matches the most similar stored prompt with
+    a cosine similarity of at least `similarity`. Stored embeddings are searched in memory,
+    new rows (from this or other processes) are loaded before each search.
+    """
+
+    embed: Optional[Embed]
+    similarity: float
+    hits: int
+    similar_hits: int
+    misses: int
+    _embeddings: ResponseCache
+    _ids: List[int]
+    _vectors: np.ndarray
+    _loaded_id: int
+    _lock: threading.Lock
+
+    def __init__(self, embed: Optional[Embed] = None, similarity: float = 0.95):
+        self.embed = embed
+        self.similarity = similarity
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        # A miss is stored right after it was looked up, so the prompt is not embedded twice
+        self._embeddings = ResponseCache(16)
+        self._ids = []
+        self._vectors = np.empty((0, 0))
+        self._loaded_id = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, normalized: str) -> np.ndarray:
+        vector = self._embeddings.get(normalized, float("inf"))
+        if vector is None:
+            vector = np.asarray(self.embed(normalized), dtype=np.float32)  # type: ignore[misc]
+            vector /= np.linalg.norm(vector) or 1.0
+            self._embeddings.put(normalized, vector)
+        return vector
+
+    def _load_new(self):
+        # Caller holds the lock
+        rows = (
+            TeamConfig.objects
+            .filter(pk__gt=self._loaded_id, embedding__isnull=False)
+            .order_by("pk")
+            .values_list("pk", "embedding")
+        )
+        vectors = []
+        for pk, embedding in rows:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+            self._ids.append(pk)
+            self._loaded_id = pk
+        if vectors:
+            new = np.stack(vectors)
+            self._vectors = new if not self._vectors.size else np.vstack([self._vectors, new])
+
+    def _find_similar(self, normalized: str) -> Optional[TeamConfig]:
+        vector = self._embed(normalized)
+        with self._lock:
+            self._load_new()
+            if not self._ids or self._vectors.shape[1] != vector.shape[0]:
+                return None
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity:
+                return None
+            pk = self._ids[best]
+        return TeamConfig.objects.filter(pk=pk).first()
+
+    def find(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Team config stored for `prompt` (or a near-duplicate of it), None if there is none."""
+        team = TeamConfig.objects.filter(prompt_hash=prompt_hash(prompt)).first()
+        if team is not None:
+            self.hits += 1
+        elif self.embed is not None:
+            team = self._find_similar(normalize_prompt(prompt))
+            if team is not None:
+                self.similar_hits += 1
+        if team is None:
+            self.misses += 1
+            return None
+        TeamConfig.objects.filter(pk=team.pk).update(hits=F("hits") + 1, last_used=timezone.now())
+        return team.config
+
+    def store(self, prompt: str, cached_configs: Dict[str, Any]):
+        """Keep the team of the builder's `cached_configs` for `prompt`."""
+        normalized = normalize_prompt(prompt)
+        embedding = None
+        if self.embed is not None:
+            embedding = self._embed(normalized).tolist()
+        TeamConfig.objects.update_or_create(
+            prompt_hash=prompt_hash(prompt),
+            defaults={
+                "prompt": prompt,
+                "config": {key: cached_configs[key] for key in TEAM_KEYS},
+                "embedding": embedding,
+            },
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "indexed": len(self._ids),
+        }
+
+
+# Used by `execute_task`, set `embed` to also reuse teams of near-duplicate prompts
+TEAM_CACHE = TeamConfigCache()
@@ -1,5 +1,52 @@
 from dataclasses import dataclass
-from typing import Callable, Iterable, List
+from functools import update_wrapper
+import inspect
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from autogen.function_utils import get_function_schema
+
+
+class CompiledTool:
+    """A toolset function with its JSON schema, built once and shared by every agent.
+
+    Functions taking the agent first (`self`) are bound per agent, the agent is left out of
+    the schema. Schemas are shared between agents and must not be modified.
+    """
+
+    __slots__ = ("name", "function", "takes_agent", "signature", "schema")
+
+    name: str
+    function: Callable
+    takes_agent: bool
+    signature: inspect.Signature
+    schema: Dict[str, Any]
+
+    def __init__(self, function: Callable):
+        assert function.__doc__, f"Tool {function.__name__} must have a docstring."
+        self.name = function.__name__
+        self.function = function
+        argspec = inspect.getfullargspec(function)
+        self.takes_agent = bool(argspec.args) and argspec.args[0] == "self"
+        signature = inspect.signature(function)
+        if self.takes_agent:
+            signature = signature.replace(parameters=list(signature.parameters.values())[1:])
+        self.signature = signature
+        self.schema = get_function_schema(self.bind(None), name=self.name, description=function.__doc__)
+
+    def bind(self, agent) -> Callable:
+        if not self.takes_agent:
+            return self.function
+        function = self.function
+
+        # Coroutine tools stay coroutine functions, so they are awaited and not run as sync tools
+        if inspect.iscoroutinefunction(function):
+            async def bound_tool(*args, **kwargs):
+                return await function(agent, *args, **kwargs)
+        else:
+            def bound_tool(*args, **kwargs):
+                return function(agent, *args, **kwargs)
+        update_wrapper(bound_tool, function)
+        bound_tool.__signature__ = self.signature  # type: ignore[attr-defined]
+        return bound_tool
 
 
 class Toolset:
@@ -10,6 +57,7 @@ class Toolset:
     preferred_llm: str
     functions: Iterable[Callable]
     init: Callable|None
+    compiled: Tuple[CompiledTool, ...]
 
     def __init__(
         self,
@@ -28,12 +76,17 @@ class Toolset:
         self.preferred_llm = preferred_llm
         self.functions = functions
         self.init = init
+        self.compiled = ()
+
+    def compile(self):
+        self.compiled = tuple(CompiledTool(function) for function in self.functions)
 
 
 TOOLSETS: List[Toolset] = []
 
 
 def register(toolset: Toolset):
+    toolset.compile()
     TOOLSETS.append(toolset)
 
 
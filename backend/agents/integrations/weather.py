@@ -1,32 +1,45 @@
-from typing import Dict, List, Tuple
+from typing import Annotated, Dict, List
 import os
+from api.cache import ResponseCache
+from api.geocode_store import GeocodeStore, normalize as normalize_location
 from api.openweathermap import ExcludeInfo, OneCallResponse, OpenWeatherMapApi, Units
+from api.singleflight import SingleFlight
+from api.tool_cache import memoize
 from ..engine.toolset import Toolset
 
 ALERTS_ENABLED = False
 HAS_API_KEY = bool(os.getenv("OPENWEATHERMAP_API_KEY"))
+# Shared by every agent's client, so agents asking about the same place at once make one call
+SINGLE_FLIGHT = SingleFlight()
+# Raw responses in standard units, shared by every agent's client whatever its units
+RESPONSE_CACHE = ResponseCache(256)
+# Every agent's client uses metric units, so tool results are shared between all of them
+CACHE_SCOPE = "openweathermap:metric"
+CURRENT_TOOL_TTL = 5 * 60
+HOURLY_TOOL_TTL = 30 * 60
+DAILY_TOOL_TTL = 90 * 60
 
 
 def _init(agent):
     if hasattr(agent, "_openweathermap"):
         return
     api_key = os.getenv("OPENWEATHERMAP_API_KEY")
-    setattr(agent, "_openweathermap", OpenWeatherMapApi(api_key, Units.METRIC))
-    setattr(agent, "_openweathermap_latlon_cache", {})
+    setattr(agent, "_openweathermap", OpenWeatherMapApi(
+        api_key,
+        Units.METRIC,
+        single_flight=SINGLE_FLIGHT,
+        local_units=True,
+        response_cache=RESPONSE_CACHE,
+    ))
+
+
+def _location_arguments(arguments: Dict):
+    return {"location": normalize_location(arguments["location"])}
 
 
 def _latlon(agent, location: str):
     api: OpenWeatherMapApi = agent._openweathermap
-    cache: Dict[str, Tuple[float, float]] = agent._openweathermap_latlon_cache
-    lower = location.lower()
-    result = cache.get(lower)
-    if result is None:
-        response = api.geocode(location)
-        if not response:
-            raise ValueError(f"Could not find location: {location}")
-        result = response[0].lat, response[0].lon
-        cache[lower] = result
-    return result
+    return GeocodeStore.default().resolve(location, api.geocode)
 
 
 def _process_alerts(alerts: List[OneCallResponse.Alert]|None):
@@ -59,27 +72,33 @@ def _format_response(
     return result
 
 
-def current(agent, location: str):
-    api: OpenWeatherMapApi = agent._openweathermap
-    lat, lon = _latlon(agent, location)
-    response = api.one_call(lat, lon, exclude=[ExcludeInfo.MINUTELY, ExcludeInfo.HOURLY, ExcludeInfo.DAILY])
+@memoize(CURRENT_TOOL_TTL, CACHE_SCOPE, _location_arguments)
+def current(self, location: Annotated[str, "Where to query the weather"]) -> dict:
+    """Get the current weather for a location."""
+    api: OpenWeatherMapApi = self._openweathermap
+    lat, lon = _latlon(self, location)
+    response = api.one_call(lon=lon, lat=lat, exclude=[ExcludeInfo.MINUTELY, ExcludeInfo.HOURLY, ExcludeInfo.DAILY])
     return _format_response(response.current, response.alerts)
 
 
-def forecast_hourly(agent, location: str):
-    api: OpenWeatherMapApi = agent._openweathermap
-    lat, lon = _latlon(agent, location)
-    response = api.one_call(lat, lon, exclude=[ExcludeInfo.CURRENT, ExcludeInfo.MINUTELY, ExcludeInfo.DAILY])
+@memoize(HOURLY_TOOL_TTL, CACHE_SCOPE, _location_arguments)
+def forecast_hourly(self, location: Annotated[str, "Where to query the weather"]) -> dict:
+    """Get the hourly forecast for a location."""
+    api: OpenWeatherMapApi = self._openweathermap
+    lat, lon = _latlon(self, location)
+    response = api.one_call(lon=lon, lat=lat, exclude=[ExcludeInfo.CURRENT, ExcludeInfo.MINUTELY, ExcludeInfo.DAILY])
     result = {"hourly": [_format_response(hour, None) for hour in response.hourly]}
     if ALERTS_ENABLED and response.alerts:
         result["alerts"] = _process_alerts(response.alerts)
     return result
 
 
-def forecast_daily(agent, location: str):
-    api: OpenWeatherMapApi = agent._openweathermap
-    lat, lon = _latlon(agent, location)
-    response = api.one_call(lat, lon, exclude=[ExcludeInfo.CURRENT, ExcludeInfo.MINUTELY, ExcludeInfo.HOURLY])
+@memoize(DAILY_TOOL_TTL, CACHE_SCOPE, _location_arguments)
+def forecast_daily(self, location: Annotated[str, "Where to query the weather"]) -> dict:
+    """Get the daily forecast for a location."""
+    api: OpenWeatherMapApi = self._openweathermap
+    lat, lon = _latlon(self, location)
+    response = api.one_call(lon=lon, lat=lat, exclude=[ExcludeInfo.CURRENT, ExcludeInfo.MINUTELY, ExcludeInfo.HOURLY])
     result = {"daily": [_format_response(day, None) for day in response.daily]}
     if ALERTS_ENABLED and response.alerts:
         result["alerts"] = _process_alerts(response.alerts)
@@ -92,6 +111,6 @@ toolset = Toolset(
     agent_description="A helpful assistant with access to weather data. Ask them to tell you about the current or forecast weather.",
     agent_system_prompt="You are a helpful AI assistant with access to weather data (via the provided functions). In fact, your only job is to lookup the weather, so please help out where you can.",
     preferred_llm="mistral",
-    functions=tuple(),
+    functions=(current, forecast_hourly, forecast_daily),
     init=_init,
 )
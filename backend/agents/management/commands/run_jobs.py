@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from agents.engine.jobs import WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Run queued agent jobs until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Jobs run at once by this process")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between looks at the queue when idle")
+        parser.add_argument("--stale-after", type=float, default=60.0, help="Seconds without heartbeat before a job is recovered")
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+            stale_after=options["stale_after"],
+        )
+        self.stdout.write(f"Worker {pool.name} running {pool.concurrency} jobs at once")
+        pool.run()
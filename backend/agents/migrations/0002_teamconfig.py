@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeamConfig",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prompt_hash", models.CharField(max_length=64, unique=True)),
+                ("prompt", models.TextField()),
+                ("config", models.JSONField()),
+                ("embedding", models.JSONField(default=None, null=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("last_used", models.DateTimeField(auto_now_add=True)),
+                ("hits", models.IntegerField(default=0)),
+            ],
+        ),
+    ]
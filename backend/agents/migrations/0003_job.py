@@ -0,0 +1,97 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0002_teamconfig"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="sender",
+            field=models.CharField(default="", max_length=100),
+        ),
+        migrations.AddField(
+            model_name="model",
+            name="max_concurrency",
+            field=models.IntegerField(default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="agent",
+            field=models.ForeignKey(
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="agents.agent",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prompt", models.TextField()),
+                ("priority", models.IntegerField(default=0)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "queued"),
+                            ("running", "running"),
+                            ("done", "done"),
+                            ("failed", "failed"),
+                            ("cancelled", "cancelled"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("cancel_requested", models.BooleanField(default=False)),
+                ("attempts", models.IntegerField(default=0)),
+                ("max_attempts", models.IntegerField(default=3)),
+                ("worker", models.CharField(default="", max_length=100)),
+                ("heartbeat", models.DateTimeField(default=None, null=True)),
+                ("error", models.TextField(default="")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("started", models.DateTimeField(default=None, null=True)),
+                ("finished", models.DateTimeField(default=None, null=True)),
+                (
+                    "model",
+                    models.ForeignKey(
+                        default=None,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="agents.model",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="agents.session",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "-priority", "created"],
+                        name="agents_job_status_8085b5_idx",
+                    )
+                ],
+            },
+        ),
+    ]
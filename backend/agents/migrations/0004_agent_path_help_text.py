@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0003_job"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="agent",
+            name="path",
+            field=models.CharField(
+                help_text="Names of the toolsets of the agent, separated by commas (e.g. weather,search)", max_length=100
+            ),
+        ),
+    ]
@@ -9,12 +9,14 @@ class Model(models.Model):
     max_tokens = models.IntegerField()
     input_price_1k = models.FloatField()
     output_price_1k = models.FloatField()
+    # Jobs using this model that may run at once (None for no limit), e.g. 1 for a local ollama
+    max_concurrency = models.IntegerField(null=True, default=None)
 
 
 class Agent(models.Model):
     name = models.CharField(max_length=100)
     model = models.ForeignKey(Model, on_delete=models.SET_DEFAULT, default=None)
-    path = models.CharField(max_length=100)
+    path = models.CharField(max_length=100, help_text="Names of the toolsets of the agent, separated by commas (e.g. weather,search)")
     description_override = models.CharField(max_length=1000)
     prompt_override = models.CharField(max_length=1000)
     init_kwargs = models.JSONField()
@@ -28,7 +30,9 @@ class Session(models.Model):
 
 class Message(models.Model):
     session = models.ForeignKey(Session, on_delete=models.CASCADE)
-    agent = models.ForeignKey(Agent, on_delete=models.CASCADE)
+    # Built experts have no Agent row, only their name is kept in `sender`
+    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, null=True, default=None)
+    sender = models.CharField(max_length=100, default="")
     time = models.DateTimeField(auto_now_add=True)
     content = models.TextField()
 
@@ -36,3 +40,48 @@ class Message(models.Model):
 class MessageFile(models.Model):
     message = models.ForeignKey(Message, on_delete=models.CASCADE)
     file = models.FileField(upload_to='uploads/')
+
+
+class TeamConfig(models.Model):
+    """Expert team built for a task, reused for tasks with the same (normalized) prompt."""
+    prompt_hash = models.CharField(max_length=64, unique=True)
+    prompt = models.TextField()
+    # Builder configs: agent names, system messages, descriptions, capabilities, toolsets and coding
+    config = models.JSONField()
+    # Of the normalized prompt, for finding near-duplicates (only with an embedding function)
+    embedding = models.JSONField(null=True, default=None)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(auto_now_add=True)
+    hits = models.IntegerField(default=0)
+
+
+class Job(models.Model):
+    """A task run for a session by the job workers (see `engine.jobs`)."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    STATUSES = [(s, s) for s in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)]
+
+    session = models.ForeignKey(Session, on_delete=models.CASCADE)
+    prompt = models.TextField()
+    # Counts against the model's `max_concurrency`
+    model = models.ForeignKey(Model, on_delete=models.SET_NULL, null=True, default=None)
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    worker = models.CharField(max_length=100, default="")
+    # Refreshed while running, jobs whose worker stopped refreshing are recovered
+    heartbeat = models.DateTimeField(null=True, default=None)
+    error = models.TextField(default="")
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, default=None)
+    finished = models.DateTimeField(null=True, default=None)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-priority", "created"]),
+        ]
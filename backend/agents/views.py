@@ -0,0 +1,45 @@
+import json
+from typing import Optional
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from .engine.live import HUB, Event
+from .models import Session
+
+
+def _sse(event: Optional[Event]):
+    if event is None:
+        # Keeps proxies from closing idle connections
+        return ": keepalive\n\n"
+    lines = [f"event: {event['type']}"]
+    if event["type"] == "message":
+        # Sent back as Last-Event-ID when the browser reconnects
+        lines.append(f"id: {event['id']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def session_events(request: HttpRequest, session_id: int):
+    """Server-sent events with the messages of a session and the partial replies of its running jobs.
+
+    Resumes after the message id in the `Last-Event-ID` header or `after` query parameter. Only
+    served over ASGI (e.g. uvicorn), WSGI servers like runserver read the endless stream to its end
+    before sending anything.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Event streams need an ASGI server, e.g. uvicorn project.asgi:application", status=501)
+    if not await Session.objects.filter(pk=session_id).aexists():
+        raise Http404("Session not found")
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("after") or "0"
+    try:
+        after = int(last_id)
+    except ValueError:
+        after = 0
+
+    async def stream():
+        async for event in HUB.events(session_id, after):
+            yield _sse(event)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
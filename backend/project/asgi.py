@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
 application = get_asgi_application()
+
+# Jobs run by this process also stream their partial replies to the session event listeners
+if int(os.getenv('AGENT_WORKERS', '0')) > 0:
+    from agents.engine.jobs import WorkerPool
+    WorkerPool(concurrency=int(os.getenv('AGENT_WORKERS', '0'))).start()
@@ -16,7 +16,9 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
+from agents import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('sessions/<int:session_id>/events', views.session_events),
 ]
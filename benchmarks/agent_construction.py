@@ -0,0 +1,60 @@
+"""AutogenAgent construction rate with a registered toolset.
+
+Run from the repository root: python -m benchmarks.agent_construction [--plain]
+
+Every other tool takes the agent first, --plain makes them all agent-free (the only set trees
+from before CompiledTool can register, use it to compare against them).
+"""
+import sys
+import time
+import timeit
+from typing import Annotated
+
+from backend.agents.engine import toolset
+from backend.agents.engine.agent import AutogenAgent
+
+LLM_CONFIG = {"model": "gpt-4", "api_key": "sk-benchmark"}
+TOOL_COUNT = 8
+
+
+def make_tool(index: int, takes_agent: bool):
+    # Same shape as the integration toolsets: annotated arguments, optionally the agent first
+    if takes_agent:
+        def tool(self, location: Annotated[str, "Where to query"], days: Annotated[int, "How many days"] = 3) -> dict:
+            return {"location": location, "days": days}
+    else:
+        def tool(location: Annotated[str, "Where to query"], days: Annotated[int, "How many days"] = 3) -> dict:
+            return {"location": location, "days": days}
+    tool.__name__ = tool.__qualname__ = f"tool_{index}"
+    tool.__doc__ = f"Benchmark tool number {index}."
+    return tool
+
+
+def register_toolset(agent_tools: bool):
+    toolset.register(toolset.Toolset(
+        name="benchmark",
+        description="Benchmark tools",
+        agent_description="A benchmark agent.",
+        agent_system_prompt="You are a benchmark agent.",
+        preferred_llm="gpt-4",
+        functions=tuple(make_tool(i, takes_agent=agent_tools and i % 2 == 0) for i in range(TOOL_COUNT)),
+        init=None,
+    ))
+
+
+def build():
+    return AutogenAgent("benchmark", ["benchmark"], llm_config=LLM_CONFIG)
+
+
+def main(number: int = 200, agent_tools: bool = True):
+    register_toolset(agent_tools)
+    build()  # warm up imports and lazily built state
+    elapsed = timeit.timeit(build, number=number)
+    print(f"{'tools':<8}{'ms/agent':>10}{'agents/s':>10}")
+    print(f"{TOOL_COUNT:<8}{elapsed / number * 1000:>10.2f}{number / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main(agent_tools="--plain" not in sys.argv[1:])
+    print(f"done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,122 @@
+"""Parse time and memory per OneCallResponse.
+
+Run from the repository root: python -m benchmarks.onecall_parse
+"""
+import gc
+import json
+import time
+import timeit
+import tracemalloc
+
+from api.openweathermap import OneCallResponse, TimemachineResponse
+
+WEATHER = [{"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"}]
+
+
+def make_one_call_payload(start: int = 1_720_000_000):
+    current = {
+        "dt": start, "sunrise": start - 3600, "sunset": start + 36000, "temp": 21.3, "feels_like": 21.0,
+        "pressure": 1013, "humidity": 60, "dew_point": 13.1, "clouds": 40, "uvi": 3.2, "visibility": 10000,
+        "wind_speed": 3.6, "wind_gust": 5.1, "wind_deg": 220, "rain": {"1h": 0.4}, "weather": WEATHER,
+    }
+    minutely = [{"dt": start + 60 * i, "precipitation": 0.1 * (i % 3)} for i in range(61)]
+    hourly = [
+        {
+            "dt": start + 3600 * i, "temp": 20 + i % 5, "feels_like": 19 + i % 5, "pressure": 1012,
+            "humidity": 55, "dew_point": 12.0, "uvi": 1.5, "clouds": 20, "visibility": 10000,
+            "wind_speed": 2.0 + i % 4, "wind_gust": 4.0, "wind_deg": 180, "pop": 0.1 * (i % 10),
+            "rain": {"1h": 0.2}, "weather": WEATHER,
+        }
+        for i in range(48)
+    ]
+    daily = [
+        {
+            "dt": start + 86400 * i, "sunrise": start + 86400 * i - 3600, "sunset": start + 86400 * i + 36000,
+            "moonrise": start + 86400 * i, "moonset": start + 86400 * i + 40000, "moon_phase": 0.5,
+            "summary": "Expect a day of partly cloudy with rain",
+            "temp": {"day": 22, "min": 14, "max": 24, "night": 16, "eve": 20, "morn": 15},
+            "feels_like": {"day": 22, "night": 16, "eve": 20, "morn": 15}, "pressure": 1014, "humidity": 50,
+            "dew_point": 11.0, "wind_speed": 4.0, "wind_gust": 7.0, "wind_deg": 200, "clouds": 30, "uvi": 5.0,
+            "pop": 0.4, "rain": 1.2, "weather": WEATHER[0],
+        }
+        for i in range(8)
+    ]
+    alerts = [{
+        "sender_name": "NIMH", "event": "Yellow Rain Warning", "start": start, "end": start + 43200,
+        "description": "Heavy rain expected", "tags": ["Rain"],
+    }]
+    return {
+        "lat": 42.6977, "lon": 23.3219, "timezone": "Europe/Sofia", "timezone_offset": 10800,
+        "current": current, "minutely": minutely, "hourly": hourly, "daily": daily, "alerts": alerts,
+    }
+
+
+def make_timemachine_payload(start: int = 1_720_000_000):
+    point = {
+        "dt": start, "sunrise": start - 3600, "sunset": start + 36000, "temp": 21.3, "feels_like": 21.0,
+        "pressure": 1013, "humidity": 60, "dew_point": 13.1, "uvi": 3.2, "clouds": 40, "visibility": 10000,
+        "wind_speed": 3.6, "wind_deg": 220, "weather": WEATHER[0],
+    }
+    return {"lat": 42.6977, "lon": 23.3219, "timezone": "Europe/Sofia", "timezone_offset": 10800, "data": [point]}
+
+
+def read_current(data: dict):
+    response = OneCallResponse(data)
+    response.current
+    return response
+
+
+def read_all(data: dict):
+    response = OneCallResponse(data)
+    response.current, response.minutely, response.hourly, response.daily, response.alerts
+    return response
+
+
+def read_timemachine(data: dict):
+    response = TimemachineResponse(data)
+    response.data
+    return response
+
+
+# Each scenario returns the response so the memory figure covers everything it keeps alive
+SCENARIOS = {
+    "construct": OneCallResponse,
+    "current only": read_current,
+    "all sections": read_all,
+    "timemachine": read_timemachine,
+}
+
+
+def measure_time(fn, data, number: int):
+    best = min(timeit.repeat(lambda: fn(data), number=number, repeat=5))
+    return best / number * 1e6
+
+
+def measure_memory(fn, data, count: int):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [fn(data) for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size / count
+
+
+def main(number: int = 2000, count: int = 500):
+    # Fresh dicts per run, parsing must not depend on caller-side caching of the payload
+    one_call = json.loads(json.dumps(make_one_call_payload()))
+    timemachine = json.loads(json.dumps(make_timemachine_payload()))
+    print(f"{'scenario':<16}{'us/response':>14}{'bytes/response':>18}")
+    for name, fn in SCENARIOS.items():
+        data = timemachine if name == "timemachine" else one_call
+        elapsed = measure_time(fn, data, number)
+        memory = measure_memory(fn, data, count)
+        print(f"{name:<16}{elapsed:>14.1f}{memory:>18.0f}")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    print(f"done in {time.perf_counter() - start:.1f}s")
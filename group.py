@@ -1,5 +1,7 @@
 from autogen import GroupChat, UserProxyAgent, GroupChatManager
 from autogen.agentchat.contrib.web_surfer import WebSurferAgent
+from api.completion_cache import CompletionCache
+from api.tracing import TRACER, JsonlExporter, TracingLogger, trace_group_chat
 import dotenv
 import os
 
@@ -11,6 +13,7 @@ litellm = {"model": "ollama_chat/mistral", "api_key": "dummy", "base_url": "http
 # CLI: litellm --model ollama_chat/mistral
 
 import autogen.oai.client
+import autogen.runtime_logging
 import autogen.token_count_utils
 autogen.oai.client.OAI_PRICE1K["llama3"] = (0.0, 0.0)
 autogen.token_count_utils.max_token_limit["llama3"] = 16384
@@ -58,6 +61,13 @@ group_chat = GroupChat(
     messages=[],
     send_introductions=True,
 )
+# Per-turn spans (speaker selection, completions, tools, weather requests) end up in GROUP_TRACE_PATH
+# (e.g. traces/group.jsonl) when it is set
+TRACE_PATH = os.getenv("GROUP_TRACE_PATH")
+if TRACE_PATH:
+    TRACER.add_exporter(JsonlExporter(TRACE_PATH))
+    autogen.runtime_logging.start(logger=TracingLogger())
+    trace_group_chat(group_chat)
 group_chat_manager = GroupChatManager(
     groupchat=group_chat,
     llm_config=litellm,
@@ -71,7 +81,8 @@ chat_result = user_proxy.initiate_chat(
     summary_args={
         "summary_role": "user",
     },
-    cache=None,
+    # Reuse completions between runs only when asked to
+    cache=CompletionCache.default() if os.getenv("COMPLETION_CACHE_PATH") else None,
 )
 #print(chat_result)
 print(chat_result.summary)
@@ -0,0 +1,19 @@
+import pytest
+
+
+class FakeClock:
+    """Monotonic clock the tests move by hand."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
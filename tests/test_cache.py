@@ -0,0 +1,22 @@
+from api.cache import ResponseCache
+
+
+def test_get_returns_fresh_entries_only(clock):
+    cache = ResponseCache(4, clock=clock)
+    cache.put("sofia", 1)
+    clock.advance(10)
+    assert cache.get("sofia", 10) == 1
+    assert cache.get("sofia", 9) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(2, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a", 60)
+    cache.put("c", 3)
+    assert cache.get("b", 60) is None
+    assert cache.get("a", 60) == 1
+    assert cache.get("c", 60) == 3
+    assert len(cache) == 2
@@ -0,0 +1,20 @@
+from api.completion_cache import CompletionCache
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = tmp_path / "completions.sqlite3"
+    cache = CompletionCache(str(path))
+    assert not path.exists()
+    assert cache.get("request", "missing") == "missing"
+    assert path.exists()
+
+
+def test_least_recently_used_completions_are_evicted(tmp_path):
+    cache = CompletionCache(str(tmp_path / "completions.sqlite3"), max_bytes=150)
+    cache.set("first", "a" * 40)
+    cache.set("second", "b" * 40)
+    cache.get("first")
+    cache.set("third", "c" * 40)
+    assert cache.get("second") is None
+    assert cache.get("first") == "a" * 40
+    assert cache.stats()["evicted"] == 1
@@ -0,0 +1,66 @@
+import pytest
+import tiktoken
+
+from api import context_window
+from api.context_window import ContextWindow, TOKENS_PER_MESSAGE
+
+
+class WordEncoding:
+    """One token per word, tiktoken's encodings are downloaded on first use."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture
+def encodings(monkeypatch):
+    resolved = []
+
+    def encoding_for_model(model):
+        resolved.append(model)
+        raise KeyError(model)
+
+    def get_encoding(name):
+        resolved.append(name)
+        return WordEncoding()
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", encoding_for_model)
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    context_window.encoding_for.cache_clear()
+    yield resolved
+    context_window.encoding_for.cache_clear()
+
+
+def message(content):
+    return {"role": "user", "content": content}
+
+
+def test_unknown_models_fall_back_to_one_cached_encoding(encodings):
+    window = ContextWindow("mistral", budget=100)
+    assert window.count(message("one two three")) == TOKENS_PER_MESSAGE + 1 + 3
+    window.count(message("four five"))
+    assert encodings == ["mistral", context_window.FALLBACK_ENCODING]
+
+
+def test_budget_is_honoured_without_a_model(encodings):
+    assert ContextWindow.for_model(None) is None
+    window = ContextWindow.for_model(None, budget=50)
+    assert window is not None
+    assert window.budget == 50
+
+
+def test_trim_keeps_the_newest_messages_that_fit(encodings):
+    window = ContextWindow("mistral", budget=20)
+    messages = [message("a b c d e f g h"), message("a b c"), message("a b c")]
+    assert window.trim(messages) == messages[1:]
+    assert window.trimmed == 1
+
+
+def test_trim_does_not_start_with_a_tool_response(encodings):
+    window = ContextWindow("mistral", budget=20)
+    messages = [
+        message("a b c d e f g h"),
+        {"role": "tool", "tool_call_id": "1", "content": "a"},
+        message("a b c"),
+    ]
+    assert window.trim(messages) == messages[2:]
@@ -0,0 +1,72 @@
+import json
+import threading
+
+from autogen.agentchat.contrib.agent_builder import _config_check
+import pytest
+
+from agents.engine import executor
+from agents.engine.executor import Context, execute_task
+from agents.engine.jobs import JobCancelled
+from agents.models import TeamConfig
+
+AGENT_CONFIGS = [{"name": "Meteorologist", "system_message": "You know the weather.", "description": "Weather expert"}]
+
+
+class FakeBuilder:
+    """Checks what the builder model would be asked, and what autogen's builder requires of it."""
+
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def build(self, building_task, default_llm_config, coding, code_execution_config, **kwargs):
+        configs = {
+            "building_task": building_task,
+            "agent_configs": AGENT_CONFIGS,
+            "coding": coding,
+            "default_llm_config": default_llm_config,
+            "code_execution_config": code_execution_config,
+        }
+        _config_check(configs)
+        self.calls.append(("build", configs))
+        return [], configs
+
+    def load(self, config_json, **kwargs):
+        configs = json.loads(config_json)
+        _config_check(configs)
+        self.calls.append(("load", configs))
+        return [], configs
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    FakeBuilder.calls = []
+    monkeypatch.setattr(executor, "AgentWithCapabilitiesBuilder", FakeBuilder)
+    return FakeBuilder
+
+
+def test_teams_are_built_once_and_loaded_with_the_same_configs(db, builder):
+    context = Context(prompt="Plan a day out in Sofia", on_msg=lambda agent, content: None)
+    execute_task(context)
+    execute_task(Context(prompt="  plan a day out in SOFIA", on_msg=context.on_msg))
+    (built_with, built), (loaded_with, loaded) = builder.calls
+    assert (built_with, loaded_with) == ("build", "load")
+    assert loaded["agent_configs"] == AGENT_CONFIGS
+    for key in ("default_llm_config", "code_execution_config"):
+        assert loaded[key] == built[key]
+    assert TeamConfig.objects.get().hits == 1
+
+
+def test_cancelled_tasks_stop_once_the_team_is_built(db, builder):
+    cancelled = threading.Event()
+    cancelled.set()
+    deltas = []
+    with pytest.raises(JobCancelled):
+        execute_task(Context(
+            prompt="Plan a day out in Sofia",
+            on_msg=lambda agent, content: None,
+            on_delta=lambda agent, delta: deltas.append(delta),
+            cancelled=cancelled,
+        ))
+    assert [call for call, _ in builder.calls] == ["build"]
@@ -0,0 +1,29 @@
+from api.geocode_store import GeocodeStore, normalize
+
+
+def test_normalize_collapses_whitespace_and_country_aliases():
+    assert normalize("  Sofia ,Bulgaria") == "sofia,bg"
+    assert normalize("New   York, usa") == "new york,us"
+
+
+def test_database_is_created_on_first_lookup(tmp_path):
+    path = tmp_path / "geocode.sqlite3"
+    store = GeocodeStore(str(path))
+    assert not path.exists()
+    assert store.get("sofia") is None
+    assert path.exists()
+    store.close()
+
+
+def test_gazetteer_is_loaded_lazily_and_does_not_override(tmp_path):
+    gazetteer = tmp_path / "places.csv"
+    gazetteer.write_text("name,country,lat,lon\nSofia,BG,42.7,23.3\n", encoding="utf-8")
+    path = tmp_path / "geocode.sqlite3"
+    store = GeocodeStore(str(path), gazetteer_path=str(gazetteer))
+    assert not path.exists()
+    store.put("sofia,bulgaria", (1.0, 2.0))
+    assert store.get("Sofia, Bulgaria") == (1.0, 2.0)
+    assert store.get("sofia") == (42.7, 23.3)
+    assert store.resolve("sofia", lambda location: []) == (42.7, 23.3)
+    assert store.stats()["stored"] == 2
+    store.close()
@@ -0,0 +1,31 @@
+from api.grid_cache import GridCachedApi
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = []
+
+    def one_call(self, lon, lat, exclude=[]):
+        self.calls.append((lat, lon))
+        return {"lat": lat, "lon": lon}
+
+
+def test_nearby_points_share_the_cell_center_forecast():
+    api = FakeApi()
+    grid = GridCachedApi(api, cell_size=0.1)
+    first = grid.one_call(lon=23.31, lat=42.69)
+    second = grid.one_call(lon=23.33, lat=42.61)
+    assert first is second
+    assert api.calls == [(42.65, 23.35)]
+    report = grid.report()
+    assert (report["hits"], report["misses"]) == (1, 1)
+    assert report["distinct_cells"] == 1
+
+
+def test_tracked_points_are_bounded():
+    grid = GridCachedApi(FakeApi(), cell_size=0.1, max_tracked=2)
+    for lat in (1.0, 2.0, 3.0):
+        grid.one_call(lon=0.0, lat=lat)
+    report = grid.report()
+    assert report["lookups"] == 3
+    assert report["distinct_points"] == 1
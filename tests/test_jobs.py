@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.utils import timezone
+import pytest
+
+from agents.engine import jobs, pool as pool_module
+from agents.engine.pool import AgentPool
+from agents.models import Agent, Job, Message, Model, Session
+
+
+class FakeAgent:
+    def __init__(self, row):
+        self.name = row.name
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def session(db):
+    model = Model.objects.create(
+        name="local", model="mistral", api_key="ollama", base_url="", max_tokens=8192, input_price_1k=0, output_price_1k=0
+    )
+    agent = Agent.objects.create(
+        name="weather", model=model, path="weather", description_override="", prompt_override="", init_kwargs={}
+    )
+    session = Session.objects.create(name="trip", group_chat=False)
+    session.agents.add(agent)
+    return session
+
+
+@pytest.fixture
+def agent_pool(monkeypatch):
+    agent_pool = AgentPool(factory=FakeAgent)
+    monkeypatch.setattr(pool_module, "AGENT_POOL", agent_pool)
+    return agent_pool
+
+
+def test_jobs_run_with_the_session_agents_from_the_pool(session, agent_pool):
+    seen = []
+
+    def execute(context):
+        seen.extend(context.agents)
+        context.on_msg(context.agents[0], "Sunny")
+
+    job = jobs.submit(session, "Weather in Sofia?")
+    assert job.model.name == "local"
+    worker = jobs.WorkerPool(execute=execute)
+    worker._run(jobs.claim(worker.name))
+    job.refresh_from_db()
+    assert job.status == Job.DONE
+    assert [agent.name for agent in seen] == ["weather"]
+    assert seen[0].resets == 1
+    assert agent_pool.stats()["idle"] == 1
+    message = Message.objects.get(session=session)
+    assert (message.sender, message.agent.name, message.content) == ("weather", "weather", "Sunny")
+
+
+def test_cancelled_running_jobs_stop_at_their_next_message(session, agent_pool):
+    job = jobs.submit(session, "Weather in Sofia?")
+
+    def execute(context):
+        assert jobs.cancel(job)
+        # What the monitor thread does once it sees the request
+        context.cancelled.set()
+        context.on_msg(context.agents[0], "Sunny")
+
+    worker = jobs.WorkerPool(execute=execute)
+    worker._run(jobs.claim(worker.name))
+    job.refresh_from_db()
+    assert job.status == Job.CANCELLED
+    assert not Message.objects.exists()
+    # The leased agents went back to the pool all the same
+    assert agent_pool.stats()["leased"] == 0
+
+
+def test_queued_jobs_are_cancelled_right_away(session):
+    job = jobs.submit(session, "Weather in Sofia?")
+    assert jobs.cancel(job)
+    job.refresh_from_db()
+    assert job.status == Job.CANCELLED
+    assert jobs.claim("worker") is None
+    assert not jobs.cancel(job)
+
+
+def test_claims_respect_priority_and_model_concurrency(session):
+    Model.objects.update(max_concurrency=1)
+    low = jobs.submit(session, "Low")
+    high = jobs.submit(session, "High", priority=1)
+    assert jobs.claim("worker") == high
+    # The model already runs a job
+    assert jobs.claim("worker") is None
+    Job.objects.filter(pk=high.pk).update(status=Job.DONE)
+    assert jobs.claim("worker") == low
+
+
+def test_jobs_of_lost_workers_are_recovered(session):
+    job = jobs.submit(session, "Weather in Sofia?", max_attempts=1)
+    jobs.claim("worker")
+    Job.objects.filter(pk=job.pk).update(heartbeat=timezone.now() - timedelta(minutes=5))
+    assert jobs.recover(stale_after=60) == 1
+    job.refresh_from_db()
+    # Out of attempts
+    assert (job.status, job.error) == (Job.FAILED, "Worker lost")
@@ -0,0 +1,52 @@
+import asyncio
+
+from django.test import AsyncClient, Client
+import pytest
+
+from agents.engine.live import LiveHub
+from agents.models import Message, Session
+
+
+@pytest.fixture
+def session(transactional_db):
+    session = Session.objects.create(name="trip", group_chat=False)
+    for content in ("Weather?", "Sunny"):
+        Message.objects.create(session=session, sender="weather", content=content)
+    return session
+
+
+def test_listeners_catch_up_then_get_live_events(session):
+    hub = LiveHub(poll_interval=0.01, keepalive=0.05)
+    first = Message.objects.filter(session=session).order_by("pk").first()
+
+    async def listen():
+        events = hub.events(session.pk, after=first.pk)
+        caught_up = await anext(events)
+        hub.publish(session.pk, {"type": "delta", "sender": "weather", "delta": "Rain"})
+        delta = await anext(events)
+        keepalive = await anext(events)
+        await events.aclose()
+        return caught_up, delta, keepalive
+
+    caught_up, delta, keepalive = asyncio.run(listen())
+    assert (caught_up["type"], caught_up["content"]) == ("message", "Sunny")
+    assert delta["delta"] == "Rain"
+    assert keepalive is None
+    assert not hub._listeners
+
+
+def test_events_are_not_served_over_wsgi(session):
+    response = Client().get(f"/sessions/{session.pk}/events")
+    assert response.status_code == 501
+
+
+def test_events_stream_over_asgi(session):
+    async def first_chunk():
+        response = await AsyncClient().get(f"/sessions/{session.pk}/events")
+        assert response["Content-Type"] == "text/event-stream"
+        chunks = aiter(response.streaming_content)
+        return (await anext(chunks)).decode()
+
+    chunk = asyncio.run(first_chunk())
+    assert chunk.startswith("event: message\nid: ")
+    assert '"content": "Weather?"' in chunk
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from agents.engine.agent import AutogenAgent
+from agents.engine.pool import AgentPool, row_key
+
+
+class FakeAgent:
+    def __init__(self, row):
+        self.row = row
+        self.resets = 0
+        self.closed = False
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+def row(name="weather", path="weather"):
+    return SimpleNamespace(
+        name=name, path=path, prompt_override="", description_override="", init_kwargs={}, model=None
+    )
+
+
+def fake_pool(clock, **kwargs):
+    return AgentPool(factory=FakeAgent, key=row_key, clock=clock, **kwargs)
+
+
+def test_released_agents_are_reset_and_reused(clock):
+    pool = fake_pool(clock)
+    with pool.lease(row()) as first:
+        pass
+    assert first.resets == 1
+    with pool.lease(row()) as second:
+        assert second is first
+        # Another configuration gets its own instance
+        with pool.lease(row(path="weather,search")) as other:
+            assert other is not first
+    assert pool.stats() == {"created": 2, "reused": 1, "evicted": 0, "idle": 2, "leased": 0}
+
+
+def test_idle_agents_are_limited_and_time_out(clock):
+    pool = fake_pool(clock, max_idle_per_key=1, idle_timeout=60)
+    first, second = pool.acquire(row()), pool.acquire(row())
+    pool.release(first)
+    pool.release(second)
+    assert second.closed and not first.closed
+    clock.advance(61)
+    assert pool.evict_idle() == 1
+    assert first.closed
+
+
+def test_reset_stops_streaming_to_the_previous_session():
+    agent = AutogenAgent("weather", [], llm_config=False)
+    agent.stream_to(lambda agent, delta: None)
+    pool = AgentPool(factory=lambda row: agent)
+    pool.release(pool.acquire(row()))
+    assert agent._on_delta is None
+    agent.close()
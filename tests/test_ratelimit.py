@@ -0,0 +1,22 @@
+from api.ratelimit import RateLimiter
+
+
+def test_every_bucket_must_have_a_token(clock):
+    limiter = RateLimiter((2, 1), (3, 60), clock=clock)
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() == 0
+    # Per-second bucket is empty, refills one token every half second
+    assert limiter._try_acquire() == 0.5
+    clock.advance(0.5)
+    assert limiter._try_acquire() == 0
+    clock.advance(1)
+    # Per-minute bucket is empty now, which takes longer
+    assert limiter._try_acquire() > 1
+    assert limiter.acquired == 3
+
+
+def test_waiting_is_counted(clock):
+    limiter = RateLimiter((1, 10), clock=clock)
+    limiter._try_acquire()
+    limiter._try_acquire()
+    assert limiter.waited == 10
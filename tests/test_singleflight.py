@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "forecast"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("sofia", fetch))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.calls + flight.coalesced < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["forecast"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 3}
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        flight.do("sofia", fail)
+    assert flight.do("sofia", lambda: "recovered") == "recovered"
+
+
+def test_tasks_share_one_call_and_survive_a_cancelled_waiter():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "forecast"
+
+    async def main():
+        first = asyncio.create_task(flight.do_async("sofia", fetch))
+        second = asyncio.create_task(flight.do_async("sofia", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "forecast"
+    assert len(calls) == 1
@@ -0,0 +1,84 @@
+import pytest
+import tiktoken
+from autogen import ConversableAgent
+import autogen.token_count_utils as token_count_utils
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from api.streaming import stream_replies
+
+LOCAL_CONFIG = {"model": "mistral", "api_key": "ollama", "base_url": "http://localhost:11434/v1"}
+
+
+class WordEncoding:
+    """One token per word, tiktoken's encodings are downloaded on first use."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def encodings(monkeypatch):
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: WordEncoding())
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: WordEncoding())
+
+
+def chunk(content=None, finish_reason=None):
+    return ChatCompletionChunk.model_validate({
+        "id": "chunk",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "mistral",
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+    })
+
+
+def completion(content):
+    return ChatCompletion.model_validate({
+        "id": "completion",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "mistral",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    })
+
+
+def local_agent(requests):
+    agent = ConversableAgent("assistant", llm_config={"config_list": [LOCAL_CONFIG], "cache_seed": None})
+
+    def create(**params):
+        requests.append(params)
+        if params.get("stream"):
+            return iter([chunk("Sunny "), chunk("in Sofia"), chunk(finish_reason="stop")])
+        return completion("Sunny in Sofia")
+
+    return agent, create
+
+
+def patch_client(monkeypatch, agent, create):
+    for client in agent.client._clients:
+        monkeypatch.setattr(client._oai_client.chat.completions, "create", create)
+
+
+def test_local_models_stream(monkeypatch):
+    requests, deltas = [], []
+    agent, create = local_agent(requests)
+    assert stream_replies(agent, deltas.append)
+    patch_client(monkeypatch, agent, create)
+    reply = agent.generate_reply([{"role": "user", "content": "Weather?"}])
+    assert reply == "Sunny in Sofia"
+    assert "".join(deltas) == "Sunny in Sofia"
+    assert requests[0]["stream"] is True
+
+
+def test_models_without_token_counts_are_not_streamed(monkeypatch):
+    def count_token(input, model):
+        raise NotImplementedError(model)
+
+    monkeypatch.setattr(token_count_utils, "count_token", count_token)
+    requests, deltas = [], []
+    agent, create = local_agent(requests)
+    assert not stream_replies(agent, deltas.append)
+    patch_client(monkeypatch, agent, create)
+    assert agent.generate_reply([{"role": "user", "content": "Weather?"}]) == "Sunny in Sofia"
+    assert deltas == []
+    assert not requests[0].get("stream")
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+from api.tool_calls import ToolCallPool, not_thread_safe
+
+
+class FakeAgent:
+    """The parts of ConversableAgent the pool uses."""
+
+    def __init__(self, **functions):
+        self.function_map = functions
+
+    def execute_function(self, call):
+        return True, {"content": str(self.function_map[call["name"]]())}
+
+    async def a_execute_function(self, call):
+        return True, {"content": str(await self.function_map[call["name"]]())}
+
+
+def calls(*names):
+    return [{"name": name, "arguments": "{}"} for name in names]
+
+
+def test_results_keep_the_call_order():
+    pool = ToolCallPool(2)
+
+    def slow():
+        time.sleep(0.05)
+        return "slow"
+
+    async def coroutine():
+        return "coroutine"
+
+    agent = FakeAgent(slow=slow, fast=lambda: "fast", coroutine=coroutine)
+    results = pool.run(agent, calls("slow", "fast", "coroutine"))
+    assert [result["content"] for result in results] == ["slow", "fast", "coroutine"]
+    pool.shutdown()
+
+
+def test_not_thread_safe_tools_run_after_the_others():
+    pool = ToolCallPool(2)
+    events = []
+
+    def threaded():
+        time.sleep(0.05)
+        events.append("threaded")
+        return "threaded"
+
+    @not_thread_safe
+    def serial():
+        events.append("serial")
+        return "serial"
+
+    agent = FakeAgent(threaded=threaded, serial=serial)
+    pool.run(agent, calls("serial", "threaded"))
+    assert events == ["threaded", "serial"]
+    events.clear()
+    asyncio.run(pool.a_run(agent, calls("serial", "threaded")))
+    assert events == ["threaded", "serial"]
+    pool.shutdown()
+
+
+def test_a_run_keeps_not_thread_safe_tools_off_the_event_loop():
+    pool = ToolCallPool(2)
+    threads = []
+
+    @not_thread_safe
+    def serial():
+        threads.append(threading.current_thread())
+        return "serial"
+
+    async def main():
+        await pool.a_run(FakeAgent(serial=serial), calls("serial", "serial"))
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+    assert len(set(threads)) == 1
+    assert threads[0] is not loop_thread
+    pool.shutdown()
+
+
+def test_calls_time_out_individually():
+    pool = ToolCallPool(2, timeout=0.05)
+    release = threading.Event()
+    agent = FakeAgent(hang=lambda: release.wait(5), fast=lambda: "fast")
+    results = pool.run(agent, calls("hang", "fast"))
+    release.set()
+    assert "timed out" in results[0]["content"]
+    assert results[1]["content"] == "fast"
+    pool.shutdown()
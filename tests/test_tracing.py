@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from api.tracing import JsonlExporter, RingBufferExporter, Tracer
+
+
+def test_spans_nest_and_reach_every_exporter(tmp_path, clock):
+    ring = RingBufferExporter()
+    path = tmp_path / "traces" / "group.jsonl"
+    tracer = Tracer([ring, JsonlExporter(str(path))], clock=clock)
+    with tracer.span("turn", kind="agent") as turn:
+        clock.advance(1)
+        with tracer.span("get_weather", kind="tool"):
+            clock.advance(2)
+    tool, parent = ring.spans(turn.trace_id)
+    assert (tool.name, tool.parent_id, tool.duration) == ("get_weather", turn.span_id, 2)
+    assert parent.duration == 3
+    assert [json.loads(line)["name"] for line in path.read_text(encoding="utf-8").splitlines()] == ["get_weather", "turn"]
+
+
+def test_errors_are_recorded_on_the_span(clock):
+    ring = RingBufferExporter()
+    tracer = Tracer([ring], clock=clock)
+    failing = tracer.wrap(lambda: 1 / 0, name="divide")
+    with pytest.raises(ZeroDivisionError):
+        failing()
+    assert ring.spans()[0].attributes["error"].startswith("ZeroDivisionError")
+
+
+def test_nothing_is_recorded_without_exporters(clock):
+    tracer = Tracer(clock=clock)
+    with tracer.span("turn") as span:
+        span.set(speaker="weather")
+    assert tracer.current is None
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from agents.engine.toolset import CompiledTool
+from agents.integrations import weather
+from api.tool_cache import ToolResultCache
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = []
+
+    def one_call(self, lon, lat, exclude=[]):
+        self.calls.append((lat, lon))
+        current = SimpleNamespace(temp=21.5, wind_speed=3.0, weather=SimpleNamespace(main="Clear"), rain=None, snow=None)
+        return SimpleNamespace(current=current, alerts=None)
+
+
+def test_current_weather_is_shared_between_agents(monkeypatch):
+    monkeypatch.setattr(weather, "_latlon", lambda agent, location: (42.7, 23.3))
+    api = FakeApi()
+    cache = ToolResultCache(path=None)
+    tool = CompiledTool(weather.current)
+    first, second = SimpleNamespace(_openweathermap=api), SimpleNamespace(_openweathermap=api)
+    assert tool.schema["function"]["parameters"]["required"] == ["location"]
+    result = cache.wrap(tool.bind(first))(location="Sofia, Bulgaria")
+    assert cache.wrap(tool.bind(second))(location="  sofia ,BG") == result
+    assert result["temp_c"] == 21.5
+    # Latitude and longitude reach one_call in the right order
+    assert api.calls == [(42.7, 23.3)]
+    assert cache.stats()["hits"] == 1